@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Detector benchmark - accuracy and per-frame cost on synthetic scenes
+
+Runs every detector on the same frames from synthetic.SceneGenerator, so it needs
+no game client and runs on Linux. Scenarios:
+
+  plain        one stone per frame as captured (brightness/occlusion/noise jitter)
+  transformed  one stone per frame with random rotation and zoom
+  busy         as transformed, on a hard-edged grey texture that floods ORB with
+               background keypoints - the case orb-cascade's candidate regions
+               (FEATURE_CANDIDATES) are meant for
+  stress       4K frames with 50 stones - precision, recall and latency of the
+               multi-match detectors
+
+ncc-optimized uses the template_optimizer.py output when it exists; keep --seed away
+from the optimizer's tuning seed (a warning is printed otherwise). Speedups are
+relative to the first detector (plain ncc) and the cascade pre-filter's rejection
+rates are reported per stage.
+
+Usage: python benchmark.py [--frames 50] [--width 1920] [--height 1080] [--scenario stress]
+"""
+
+import argparse
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from detection import find_template_location_colored, find_all_template_locations_in_frame, load_template, load_optimized_template
+from feature_detector import find_template_location_features, feature_candidates
+from cascade import CascadeFilter
+import tiled_match
+from synthetic import SceneGenerator, make_texture_background, measure
+
+TEMPLATE_PATH = "ornekresim.png"
+SCENARIOS = ("plain", "transformed", "busy", "stress")
+
+# name -> detector(template_path, screenshot_region, frame=...) with the utils return format
+DETECTORS: Dict[str, Callable] = {
+    "ncc": lambda path, region, frame: find_template_location_colored(path, region, frame=frame, tiled=False, cascade=False, optimized=False),
+    "ncc-tiled": lambda path, region, frame: find_template_location_colored(path, region, frame=frame, tiled=True, cascade=False, optimized=False),
+    "ncc-cascade": lambda path, region, frame: find_template_location_colored(path, region, frame=frame, tiled=False, cascade=True, optimized=False),
+    # template_optimizer.py output when present, else the same as ncc
+    "ncc-optimized": lambda path, region, frame: find_template_location_colored(path, region, frame=frame, tiled=False, cascade=False),
+    "ncc-optimized-cascade": lambda path, region, frame: find_template_location_colored(path, region, frame=frame, tiled=False, cascade=True),
+    "orb": lambda path, region, frame: find_template_location_features(path, region, frame=frame, method="orb"),
+    "orb-cascade": lambda path, region, frame: find_template_location_features(path, region, frame=frame, candidates=feature_candidates(path, frame), method="orb"),
+    "akaze": lambda path, region, frame: find_template_location_features(path, region, frame=frame, method="akaze"),
+}
+
+# name -> detector(frame) returning every match, find_all_template_locations format
+MULTI_DETECTORS: Dict[str, Callable] = {
+    "ncc-all": lambda frame: find_all_template_locations_in_frame(frame, load_template(TEMPLATE_PATH)),
+    "ncc-all-cascade": lambda frame: find_all_template_locations_in_frame(
+        frame, load_template(TEMPLATE_PATH), cascade=CascadeFilter.from_path(TEMPLATE_PATH)),
+}
+
+
+def run_single(scenario: str, frames: int, width: int, height: int, seed: int) -> List[str]:
+    """Miss rate and ms/frame of the single-result detectors, one stone per frame"""
+    options = {"rotation": (-30, 30), "scale": (0.7, 1.3)} if scenario in ("transformed", "busy") else {}
+    if scenario == "busy":
+        options["backgrounds"] = [make_texture_background(width, height, np.random.default_rng(seed))]
+    generator = SceneGenerator({"stone": TEMPLATE_PATH}, width, height, count=1, seed=seed, **options)
+    scenes = [generator.generate() for _ in range(frames)]
+    region = (0, 0, width, height)
+    cascade = CascadeFilter.from_path(TEMPLATE_PATH)
+
+    report = [f"--- {scenario} ({frames} frames, {width}x{height})"]
+    baseline_ms = None
+    for name, detector in DETECTORS.items():
+        try:
+            detector(TEMPLATE_PATH, region, frame=scenes[0][0])  # warm template caches
+        except ValueError as e:
+            report.append(f"{name:>16}: skipped ({e})")
+            continue
+        if name == "ncc-tiled":
+            # The warm-up call only schedules background tuning; tune now so timing sees the tuned tiles
+            tiled_match.autotune(scenes[0][0].shape, load_template(TEMPLATE_PATH).shape)
+
+        misses = 0
+        rejection = {}
+        start = time.perf_counter()
+        for frame, boxes in scenes:
+            detection = detector(TEMPLATE_PATH, region, frame=frame)
+            _, x, y, w, h = boxes[0]
+            if not detection or np.hypot(detection[0] - (x + w / 2), detection[1] - (y + h / 2)) > max(w, h) / 2:
+                misses += 1
+            if name == "ncc-cascade":
+                for stage, rate in cascade.last_stats.items():
+                    rejection[stage] = rejection.get(stage, 0.0) + rate / frames
+        elapsed_ms = (time.perf_counter() - start) * 1000 / frames
+
+        if baseline_ms is None:
+            baseline_ms = elapsed_ms
+        line = f"{name:>16}: miss rate {misses / frames:6.1%}  {elapsed_ms:8.2f} ms/frame  x{baseline_ms / elapsed_ms:5.2f}"
+        if rejection:
+            line += "  rejected: " + ", ".join(f"{stage} {rate:.1%}" for stage, rate in rejection.items())
+        report.append(line)
+    return report
+
+
+def run_stress(frames: int, seed: int, width: int = 3840, height: int = 2160, count: int = 50) -> List[str]:
+    """Precision, recall and latency of the multi-match detectors on crowded 4K scenes"""
+    report = [f"--- stress ({frames} frames, {width}x{height}, {count} stones)"]
+    for name, detector in MULTI_DETECTORS.items():
+        generator = SceneGenerator({"stone": TEMPLATE_PATH}, width, height, count=count, seed=seed)
+        result = measure(detector, generator, frames)
+        report.append(f"{name:>16}: precision {result['precision']:6.1%}  recall {result['recall']:6.1%}  "
+                      f"{result['mean_ms']:8.2f} ms/frame (p95 {result['p95_ms']:.2f})  "
+                      f"generator {result['generate_ms']:.2f} ms/frame")
+    return report
+
+
+def run(frames: int, width: int, height: int, seed: int = 0, scenarios: Tuple[str, ...] = SCENARIOS) -> List[str]:
+    report = []
+    optimized = load_optimized_template(TEMPLATE_PATH)
+    if optimized is not None and seed in optimized[1].get("synthetic_seeds", []):
+        report.append(f"WARNING: seed {seed} is one template_optimizer.py tuned on - ncc-optimized results "
+                      f"are not held out, use another --seed")
+    for scenario in scenarios:
+        if scenario == "stress":
+            report.extend(run_stress(frames, seed))
+        else:
+            report.extend(run_single(scenario, frames, width, height, seed))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append",
+                        help="Scenario to run, may be repeated (default: all)")
+    args = parser.parse_args()
+
+    scenarios = tuple(args.scenario) if args.scenario else SCENARIOS
+    for line in run(args.frames, args.width, args.height, args.seed, scenarios):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
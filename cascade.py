@@ -0,0 +1,188 @@
+"""
+Cascade pre-filter - reject most of the frame before correlation
+
+TM_CCOEFF_NORMED is evaluated for every pixel although most of the window is terrain
+or UI that can never contain a stone. The cascade runs two cheap stages over every
+template-sized window position first, on a half-resolution (pyrDown) copy of the
+frame, which also smooths the noise that scrambles hue on dark pixels:
+
+1. Color: hue/saturation back-projection of the template's dominant colors; a window
+   needs at least color_ratio times the template's own share of those colors.
+2. Texture: integral-image mean/variance gating; flat windows (std far below the
+   template std) and windows far off the template brightness are rejected.
+
+Full correlation then only runs on the bounding boxes of the surviving positions,
+padded by the template size, so scores there are identical to a full-frame match.
+
+The color model is tuned on synthetic scenes only, so CASCADE_FILTERING ships off. A
+stone whose hue shifts in the real client (lighting, night, effects) would be rejected
+before correlation. With many stones on screen the survivors cover so many regions
+that the cascade is slower than one full match (benchmark.py stress).
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HIST_BINS = (30, 32)            # hue, saturation
+DOMINANT_MASS = 0.8             # share of template pixels covered by the dominant bins
+MIN_VALUE = 40                  # darker pixels have no reliable hue and are ignored
+COLOR_RATIO = 0.5
+STD_RATIO = 0.4
+MEAN_TOLERANCE = 80.0
+FULL_MATCH_AREA = 0.6           # fall back to one full match when survivors cover more of the frame
+REGION_CELL = 32                # survivor grouping cell, in pixels
+
+_cascades: Dict[str, "CascadeFilter"] = {}
+
+
+def _window_sums(integral: np.ndarray, h: int, w: int) -> np.ndarray:
+    """Sum over every h x w window, indexed by window top-left (same shape as a matchTemplate result)"""
+    return integral[h:, w:] - integral[:-h, w:] - integral[h:, :-w] + integral[:-h, :-w]
+
+
+class CascadeFilter:
+    """Color and mean/variance stages built once from a template"""
+
+    def __init__(self, template: np.ndarray, color_ratio: float = COLOR_RATIO, std_ratio: float = STD_RATIO,
+                 mean_tolerance: float = MEAN_TOLERANCE):
+        self.full_h, self.full_w = template.shape[:2]
+        template = cv2.pyrDown(template)
+        alpha = template[:, :, 3] > 0 if template.shape[2] == 4 else np.ones(template.shape[:2], dtype=bool)
+        bgr = np.ascontiguousarray(template[:, :, :3])
+        self.h, self.w = bgr.shape[:2]
+        self.color_ratio = color_ratio
+        self.mean_tolerance = mean_tolerance
+
+        # Stage 1: dominant hue/saturation bins as a 0/255 lookup histogram
+        hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+        valid = (alpha & (hsv[:, :, 2] >= MIN_VALUE)).astype(np.uint8) * 255
+        hist = cv2.calcHist([hsv], [0, 1], valid, list(HIST_BINS), [0, 180, 0, 256]).ravel()
+        order = np.argsort(hist)[::-1]
+        covered = np.cumsum(hist[order]) / max(hist.sum(), 1)
+        dominant = order[:int(np.searchsorted(covered, DOMINANT_MASS)) + 1]
+        lookup = np.zeros(hist.size, dtype=np.float32)
+        lookup[dominant] = 255
+        self.lookup = lookup.reshape(HIST_BINS)
+
+        # Share over the whole window, since frame windows are measured that way (masked pixels count as misses)
+        template_hits = self._color_hits(hsv) > 0
+        self.template_color_share = float((template_hits & alpha).sum()) / alpha.size
+
+        # Stage 2: template brightness statistics
+        gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY).astype(np.float64)[alpha]
+        self.template_mean = float(gray.mean())
+        self.min_std = float(gray.std()) * std_ratio
+
+        self.last_stats: Dict[str, float] = {}
+
+    def _color_hits(self, hsv: np.ndarray) -> np.ndarray:
+        """1 where a pixel is bright enough and in a dominant bin, else 0 - same rule for template and frame"""
+        hits = cv2.calcBackProject([hsv], [0, 1], self.lookup, [0, 180, 0, 256], 1)
+        hits[hsv[:, :, 2] < MIN_VALUE] = 0
+        return hits // 255
+
+    @classmethod
+    def from_path(cls, template_path: str) -> "CascadeFilter":
+        """Build once per template path and cache"""
+        cascade = _cascades.get(template_path)
+        if cascade is None:
+            template = cv2.imread(template_path, cv2.IMREAD_UNCHANGED)
+            if template is None:
+                raise FileNotFoundError(f"Template image not found: {template_path}")
+            if template.ndim == 2:
+                template = cv2.cvtColor(template, cv2.COLOR_GRAY2BGR)
+            cascade = _cascades[template_path] = cls(template)
+        return cascade
+
+    def candidate_mask(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Boolean mask over window positions (matchTemplate result shape) that survive both stages.
+        Rejection rates are stored in last_stats.
+        """
+        h, w = self.h, self.w
+        area = float(h * w)
+        result_shape = (frame.shape[0] - self.full_h + 1, frame.shape[1] - self.full_w + 1)
+
+        frame = cv2.pyrDown(frame)
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        color_share = _window_sums(cv2.integral(self._color_hits(hsv)), h, w) / area
+        mask = color_share >= self.template_color_share * self.color_ratio
+        color_survivors = int(mask.sum())
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        sums, squares = cv2.integral2(gray, sdepth=cv2.CV_64F)
+        mean = _window_sums(sums, h, w) / area
+        variance = _window_sums(squares, h, w) / area - mean ** 2
+        mask &= variance >= self.min_std ** 2
+        mask &= np.abs(mean - self.template_mean) <= self.mean_tolerance
+
+        total = mask.size
+        self.last_stats = {
+            'color_rejected': 1.0 - color_survivors / total,
+            'texture_rejected': 1.0 - float(mask.sum()) / max(color_survivors, 1),
+            'rejected': 1.0 - float(mask.sum()) / total,
+        }
+
+        # Back to full-resolution window positions: position (x, y) uses half-res cell (x // 2, y // 2)
+        rows = np.minimum(np.arange(result_shape[0]) // 2, mask.shape[0] - 1)
+        cols = np.minimum(np.arange(result_shape[1]) // 2, mask.shape[1] - 1)
+        return mask[np.ix_(rows, cols)]
+
+    def candidate_regions(self, frame: np.ndarray) -> Optional[List[Tuple[int, int, int, int]]]:
+        """
+        (x, y, width, height) frame regions to correlate, already padded by the template size.
+
+        :return: Region list (empty when nothing survives), or None when survivors cover
+                 so much of the frame that a single full match is cheaper
+        """
+        mask = self.candidate_mask(frame)
+        if not mask.any():
+            return []
+
+        # Group survivors on a coarse cell grid so scattered positions do not become hundreds of tiny regions
+        out_h, out_w = mask.shape
+        cells_y, cells_x = -(-out_h // REGION_CELL), -(-out_w // REGION_CELL)
+        padded = np.zeros((cells_y * REGION_CELL, cells_x * REGION_CELL), dtype=bool)
+        padded[:out_h, :out_w] = mask
+        cells = padded.reshape(cells_y, REGION_CELL, cells_x, REGION_CELL).any(axis=(1, 3)).astype(np.uint8)
+
+        count, _, boxes, _ = cv2.connectedComponentsWithStats(cells, connectivity=8)
+        regions = []
+        for cx, cy, cw, ch, _ in boxes[1:count]:
+            x, y = int(cx) * REGION_CELL, int(cy) * REGION_CELL
+            x1, y1 = min((int(cx) + int(cw)) * REGION_CELL, out_w), min((int(cy) + int(ch)) * REGION_CELL, out_h)
+            regions.append((x, y, x1 - x + self.full_w - 1, y1 - y + self.full_h - 1))
+
+        covered = sum(rw * rh for _, _, rw, rh in regions)
+        if covered >= FULL_MATCH_AREA * frame.shape[0] * frame.shape[1]:
+            return None
+        return regions
+
+
+def match_template_cascade(frame: np.ndarray, template: np.ndarray, cascade: CascadeFilter,
+                           method: int = cv2.TM_CCOEFF_NORMED,
+                           matcher: Callable = cv2.matchTemplate) -> Optional[Tuple[float, Tuple[int, int]]]:
+    """
+    Best correlation score over the cascade survivors.
+
+    :param matcher: matchTemplate-compatible callable for the full-frame fallback, e.g.
+                    tiled_match.match_template_tiled; survivor regions are small and use cv2 directly
+    :return: (max_val, max_loc) in frame coordinates like cv2.minMaxLoc, or None when nothing survives
+    """
+    regions = cascade.candidate_regions(frame)
+    if regions is None:
+        _, max_val, _, max_loc = cv2.minMaxLoc(matcher(frame, template, method))
+        return max_val, max_loc
+
+    best = None
+    for x, y, w, h in regions:
+        result = cv2.matchTemplate(frame[y:y + h, x:x + w], template, method)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if best is None or max_val > best[0]:
+            best = (max_val, (x + max_loc[0], y + max_loc[1]))
+    return best
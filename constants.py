@@ -3,10 +3,35 @@
 CLICK_DELAY = 0.5
 MAX_WINDOW_WAIT = 30
 WINDOW_CHECK_INTERVAL = 1.0
+MIN_POLL_INTERVAL = 0.05  # wait_for_any starts polling this fast and backs off to WINDOW_CHECK_INTERVAL
 APPROVAL_TIMEOUT = 30
+OK_BUTTON_WAIT = 5
 DEFAULT_CONFIDENCE = 0.5
+TILED_MATCHING = True  # find_template_location_colored: parallel tiles, auto-tuned per machine (tiled_match.py)
+CASCADE_FILTERING = False  # find_template_location_colored: color/variance pre-filter before correlation (cascade.py); off until checked on real captures
+FEATURE_CANDIDATES = False  # orb/akaze stone detector: keypoints only in cascade survivors; slower, no recall gain yet (benchmark.py transformed/busy)
+FEATURE_MAX_ZOOM = 1.3  # feature_candidates: largest camera zoom the candidate regions are padded for
 
 # Icons dictionary
 ICONS = {
     'OK_BUTTON': 'ok_button.png'
-}
\ No newline at end of file
+}
+
+# Pixel probes (probes.ProbeSet.from_specs) - coordinates relative to the window client area
+# 'NAME': {'samples': [(x, y), (x, y, w, h)], 'color': (b, g, r), 'tolerance': 30, 'min_ratio': 0.8}
+# TARGET_HP_BAR pauses stone scanning while visible, OK_BUTTON is tried before the template in process_approval
+PROBE_SPECS = {}
+
+# Recovery engine (StoneBot.recover)
+RECOVERY_BASE_DELAY = 0.05
+RECOVERY_MAX_DELAY = 5.0
+CLIENT_EXECUTABLE = None  # Metin2 client path for the restart stage, None disables restart
+
+# On-demand profiler (profiler.py) - toggled by SIGUSR1/SIGBREAK, the hotkey or the control endpoint
+PROFILE_DURATION = 30  # seconds per session unless stopped early
+PROFILE_INTERVAL = 0.01  # seconds between stack samples (100 Hz)
+PROFILE_OUTPUT_DIR = 'profiles'
+PROFILE_TRACEMALLOC_FRAMES = 10
+PROFILE_TOP_ALLOCATIONS = 25
+PROFILE_HOTKEY = 'F12'  # None disables the hotkey
+PROFILE_CONTROL_PORT = None  # e.g. 8765 for http://127.0.0.1:8765/profile, None disables the endpoint
@@ -0,0 +1,222 @@
+"""
+Frame based template matchers
+
+Pure OpenCV/NumPy part of the detection code: works on an already grabbed BGR frame,
+so it also runs without a Windows desktop (synthetic.py, benchmark.py). utils.py
+re-exports these functions and adds screen capture on top.
+
+When template_optimizer.py has written <name>.optimized.png/.json next to a template,
+find_template_location_colored matches the cropped, downscaled and masked version
+instead and maps the result back to the original template box.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from constants import TILED_MATCHING, CASCADE_FILTERING
+from tiled_match import match_template_tiled
+from cascade import CascadeFilter, match_template_cascade
+
+logger = logging.getLogger(__name__)
+
+_template_cache: Dict[Tuple[str, int], np.ndarray] = {}
+_optimized_cache: Dict[str, Optional[Tuple[str, dict]]] = {}
+
+OPTIMIZED_SUFFIX = ".optimized"
+
+def load_template(template_path: str, flags: int = cv2.IMREAD_COLOR) -> np.ndarray:
+    """Şablonu diskten bir kez okur ve önbellekte tutar."""
+    key = (template_path, flags)
+    template = _template_cache.get(key)
+    if template is None:
+        template = cv2.imread(template_path, flags)
+        if template is None:
+            raise FileNotFoundError(f"Template image not found: {template_path}")
+        _template_cache[key] = template
+    return template
+
+def match_template_in_frame(frame: np.ndarray, template: np.ndarray, region: Optional[tuple], threshold: float = 0.4, tiled: bool = False, cascade: Optional[CascadeFilter] = None) -> Optional[tuple]:
+    """
+    Önceden alınmış bir kare üzerinde şablon eşleştirme yapar.
+
+    :param frame: region'dan alınmış BGR kare
+    :param template: BGR şablon
+    :param region: Karenin alındığı (x, y, width, height) bölgesi, global koordinatlar için
+    :param threshold: Eşleşme eşik değeri
+    :param tiled: True ise kare parçalara bölünüp thread havuzunda eşleştirilir (tiled_match)
+    :param cascade: Verilirse korelasyon yalnızca ön filtreden geçen bölgelerde yapılır (cascade)
+    :return: (global_x, global_y, h, w, max_val) veya None
+    """
+    matcher = match_template_tiled if tiled else cv2.matchTemplate
+    if cascade is not None:
+        best = match_template_cascade(frame, template, cascade, cv2.TM_CCOEFF_NORMED, matcher=matcher)
+        if best is None:
+            return None
+        max_val, max_loc = best
+    else:
+        result = matcher(frame, template, cv2.TM_CCOEFF_NORMED)
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+
+    if max_val < threshold:
+        return None
+
+    h, w = template.shape[:2]
+    origin_x, origin_y = (region[0], region[1]) if region else (0, 0)
+    return (origin_x + max_loc[0] + w // 2, origin_y + max_loc[1] + h // 2, h, w, max_val)
+
+def optimized_paths(template_path: str) -> Tuple[str, str]:
+    """Optimize edilmiş şablonun (png, json) yolları: ornekresim.png -> ornekresim.optimized.png/.json"""
+    stem, ext = os.path.splitext(template_path)
+    return stem + OPTIMIZED_SUFFIX + ext, stem + OPTIMIZED_SUFFIX + ".json"
+
+def file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def load_optimized_template(template_path: str) -> Optional[Tuple[str, dict]]:
+    """
+    template_optimizer.py çıktısını bir kez okur ve önbellekte tutar.
+
+    :return: (optimize edilmiş png yolu, metadata) veya yoksa / kaynak şablon değiştiyse None
+    """
+    if template_path in _optimized_cache:
+        return _optimized_cache[template_path]
+
+    optimized = None
+    image_path, meta_path = optimized_paths(template_path)
+    if os.path.exists(image_path) and os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("source_sha1") != file_digest(template_path):
+            logger.warning("Optimized template %s is stale (source changed), using %s - re-run template_optimizer.py",
+                           image_path, template_path)
+        else:
+            optimized = (image_path, meta)
+            logger.info("Using optimized template %s (crop %s, scale %.3g, expected speedup x%.1f)",
+                        image_path, meta["crop"], meta["scale"], meta.get("speedup", 1.0))
+    _optimized_cache[template_path] = optimized
+    return optimized
+
+def match_optimized_in_frame(frame: np.ndarray, template: np.ndarray, meta: dict, region: Optional[tuple], tiled: bool = False, cascade: Optional[CascadeFilter] = None) -> Optional[tuple]:
+    """
+    Optimize edilmiş şablonu küçültülmüş karede eşleştirir, sonucu orijinal şablon kutusuna çevirir.
+
+    :param template: Optimize edilmiş BGR şablon (kırpılmış, ölçeklenmiş, maske dışı ortalama ile dolu)
+    :param meta: template_optimizer.py metadata'sı (crop, scale, source_size, threshold)
+    :param cascade: Orijinal şablondan kurulmuş ön filtre; tam çözünürlüklü karede çalışır ve yalnızca
+                    geçen bölgeler küçültülüp eşleştirilir
+    :return: match_template_in_frame ile aynı biçim, h ve w orijinal şablonun boyutları
+    """
+    scale = meta["scale"]
+    regions = cascade.candidate_regions(frame) if cascade is not None else None
+    if regions is None:
+        regions = [(0, 0, frame.shape[1], frame.shape[0])]
+    matcher = match_template_tiled if tiled and len(regions) == 1 else cv2.matchTemplate
+
+    best = None
+    for x, y, w, h in regions:
+        area = frame[y:y + h, x:x + w]
+        small = area if scale == 1 else cv2.resize(area, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        if small.shape[0] < template.shape[0] or small.shape[1] < template.shape[1]:
+            continue
+        _, max_val, _, max_loc = cv2.minMaxLoc(matcher(small, template, cv2.TM_CCOEFF_NORMED))
+        if best is None or max_val > best[0]:
+            best = (max_val, x + max_loc[0] / scale, y + max_loc[1] / scale)
+
+    if best is None or best[0] < meta["threshold"]:
+        return None
+
+    max_val, crop_left, crop_top = best
+    crop_x, crop_y = meta["crop"][:2]
+    source_w, source_h = meta["source_size"]
+    left = int(round(crop_left)) - crop_x
+    top = int(round(crop_top)) - crop_y
+    origin_x, origin_y = (region[0], region[1]) if region else (0, 0)
+    return (origin_x + left + source_w // 2, origin_y + top + source_h // 2, source_h, source_w, max_val)
+
+def find_template_location_colored(template_path: str, screenshot_region: tuple, frame: Optional[np.ndarray] = None, tiled: bool = TILED_MATCHING, cascade: bool = CASCADE_FILTERING, optimized: bool = True) -> tuple:
+    # Belirtilen bölgenin ekran görüntüsünü al (paylaşılan kare verilmediyse)
+    if frame is None:
+        from utils import grab_frame
+        frame = grab_frame(screenshot_region)
+
+    # template_optimizer.py çıktısı varsa onu kullan
+    optimized_template = load_optimized_template(template_path) if optimized else None
+    if optimized_template is not None:
+        image_path, meta = optimized_template
+        # Ön filtre orijinal şablonla tam çözünürlükte çalışır (küçük şablonda istatistikleri güvenilmez).
+        # Küçültülmüş karede tüm eşleştirme ön filtreden ucuz olduğundan yalnızca scale == 1 iken kullanılır.
+        cascade_filter = CascadeFilter.from_path(template_path) if cascade and meta["scale"] == 1 else None
+        return match_optimized_in_frame(frame, load_template(image_path, cv2.IMREAD_COLOR), meta, screenshot_region, tiled=tiled, cascade=cascade_filter)
+
+    # Şablonu yükle (önbellekten)
+    template = load_template(template_path, cv2.IMREAD_COLOR)
+
+    # Template matching uygula (SellMerchant pattern için düşük threshold)
+    cascade_filter = CascadeFilter.from_path(template_path) if cascade else None
+    return match_template_in_frame(frame, template, screenshot_region, threshold=0.4, tiled=tiled, cascade=cascade_filter)
+
+def is_significant_overlap(match1: Tuple[int, int, int, int, float], match2: Tuple[int, int, int, int, float], overlap_threshold: float = 0.7) -> bool:
+    """
+    İki eşleşme arasında önemli bir çakışma olup olmadığını kontrol eder.
+
+    :param match1: Birinci eşleşme (x, y, w, h, confidence)
+    :param match2: İkinci eşleşme (x, y, w, h, confidence)
+    :param overlap_threshold: Çakışma için eşik değeri
+    :return: Önemli çakışma varsa True, yoksa False
+    """
+    x1, y1, w1, h1, _ = match1
+    x2, y2, w2, h2, _ = match2
+
+    overlap_x = max(0, min(x1 + w1, x2 + w2) - max(x1, x2))
+    overlap_y = max(0, min(y1 + h1, y2 + h2) - max(y1, y2))
+    overlap_area = overlap_x * overlap_y
+    
+    min_area = min(w1 * h1, w2 * h2)
+    
+    return overlap_area / min_area > overlap_threshold
+
+def find_all_template_locations_in_frame(
+    frame: np.ndarray,
+    template: np.ndarray,
+    region: Optional[tuple] = None,
+    threshold: float = 0.65,
+    cascade: Optional[CascadeFilter] = None
+) -> List[Tuple[int, int, int, int, float]]:
+    """
+    Kare üzerinde şablonun tüm eşleşmelerini bulur (find_all_template_locations'ın kare tabanlı karşılığı).
+
+    Skor haritasındaki yerel maksimumlar eşik ile seçilir, çakışanlar is_significant_overlap ile elenir.
+
+    :param frame: region'dan alınmış BGR kare
+    :param template: BGR şablon
+    :param region: Karenin alındığı (x, y, width, height) bölgesi, global koordinatlar için
+    :param threshold: Eşleşme eşik değeri
+    :param cascade: Verilirse korelasyon yalnızca ön filtreden geçen bölgelerde yapılır
+    :return: [(center_x, center_y, w, h, confidence), ...] listesi, en iyi skor önce
+    """
+    h, w = template.shape[:2]
+    regions = cascade.candidate_regions(frame) if cascade is not None else None
+    if regions is None:
+        regions = [(0, 0, frame.shape[1], frame.shape[0])]
+
+    kernel = np.ones((max(1, h // 2), max(1, w // 2)), dtype=np.uint8)
+    origin_x, origin_y = (region[0], region[1]) if region else (0, 0)
+    candidates = []
+    for x, y, rw, rh in regions:
+        result = cv2.matchTemplate(frame[y:y + rh, x:x + rw], template, cv2.TM_CCOEFF_NORMED)
+        peaks = (result >= threshold) & (result >= cv2.dilate(result, kernel))
+        for py, px in zip(*np.nonzero(peaks)):
+            candidates.append((origin_x + x + int(px) + w // 2, origin_y + y + int(py) + h // 2, w, h, float(result[py, px])))
+
+    matches = []
+    for match in sorted(candidates, key=lambda m: m[4], reverse=True):
+        if not any(is_significant_overlap(match, existing) for existing in matches):
+            matches.append(match)
+    return matches
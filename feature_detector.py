@@ -0,0 +1,186 @@
+"""
+Keypoint based template detector (ORB / AKAZE) for camera rotation and zoom changes.
+
+Normalized cross-correlation only matches the template at its original scale and
+orientation. This detector matches binary keypoint descriptors instead and fits a
+similarity transform with RANSAC, so it keeps finding the stone when the camera
+turns or zooms. Template descriptors are computed once per (template, method) and
+cached.
+
+Frame keypoints can be limited to candidate regions, e.g. feature_candidates (the
+cascade color/texture survivors, which do not depend on rotation), so background
+texture away from the stone cannot use up the ORB feature budget. The cascade costs
+more than it saves on the synthetic scenes and has not shown a recall gain there,
+including the busy texture scenario (benchmark.py), so the bot only does this when
+FEATURE_CANDIDATES is set.
+
+Return format is the same as utils.find_template_location_colored:
+(global_x, global_y, h, w, score)
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from cascade import CascadeFilter
+from constants import FEATURE_MAX_ZOOM
+
+logger = logging.getLogger(__name__)
+
+# Lowe ratio test and RANSAC settings
+RATIO_TEST = 0.75
+RANSAC_REPROJ_THRESHOLD = 5.0
+MIN_INLIERS = 8
+
+_template_features: Dict[Tuple[str, str], tuple] = {}
+
+
+def create_feature_extractor(method: str = "orb"):
+    """Create an ORB or AKAZE extractor - both give binary descriptors (Hamming distance)"""
+    if method == "orb":
+        return cv2.ORB_create(nfeatures=1000, scaleFactor=1.2, nlevels=8, edgeThreshold=15, patchSize=15)
+    if method == "akaze":
+        if not hasattr(cv2, "AKAZE_create"):
+            raise ValueError("AKAZE is not available in this OpenCV build")
+        return cv2.AKAZE_create()
+    raise ValueError(f"Unknown feature method: {method}")
+
+
+def get_template_features(template_path: str, method: str = "orb") -> tuple:
+    """
+    Compute template keypoints and descriptors once and cache them.
+
+    The template alpha channel (if any) is used as detection mask so transparent
+    background pixels do not produce keypoints.
+
+    :param template_path: Template image path
+    :param method: "orb" or "akaze"
+    :return: (keypoints, descriptors, (h, w))
+    """
+    key = (template_path, method)
+    cached = _template_features.get(key)
+    if cached is not None:
+        return cached
+
+    template = cv2.imread(template_path, cv2.IMREAD_UNCHANGED)
+    if template is None:
+        raise FileNotFoundError(f"Template image not found: {template_path}")
+
+    mask = None
+    if template.ndim == 3 and template.shape[2] == 4:
+        mask = np.where(template[:, :, 3] > 0, 255, 0).astype(np.uint8)
+        template = template[:, :, :3]
+    gray = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY) if template.ndim == 3 else template
+
+    keypoints, descriptors = create_feature_extractor(method).detectAndCompute(gray, mask)
+    if descriptors is None or len(keypoints) < MIN_INLIERS:
+        logger.warning("Template %s has only %d %s keypoints", template_path, len(keypoints), method)
+
+    cached = (keypoints, descriptors, gray.shape[:2])
+    _template_features[key] = cached
+    return cached
+
+
+def _candidate_mask(shape: Tuple[int, int], candidates: List[Tuple[int, int, int, int]]) -> np.ndarray:
+    """Build a keypoint detection mask from (x, y, width, height) frame rectangles"""
+    mask = np.zeros(shape, dtype=np.uint8)
+    for x, y, w, h in candidates:
+        mask[max(0, y):max(0, y + h), max(0, x):max(0, x + w)] = 255
+    return mask
+
+
+def feature_candidates(template_path: str, frame: np.ndarray,
+                       max_zoom: float = FEATURE_MAX_ZOOM) -> Optional[List[Tuple[int, int, int, int]]]:
+    """
+    Frame rectangles worth extracting keypoints in, from the template's cascade pre-filter.
+
+    The cascade pads its regions by the unscaled template size; they are grown here so a
+    stone rotated and zoomed up to max_zoom still fits around the same center.
+
+    :param max_zoom: Largest camera zoom to allow for, relative to the template
+    :return: (x, y, width, height) rectangles clipped to the frame, or None when the whole
+             frame should be searched (cascade kept most of the frame, or rejected
+             everything - a rotated or zoomed stone can fall below the color share the
+             cascade expects)
+    """
+    cascade = CascadeFilter.from_path(template_path)
+    regions = cascade.candidate_regions(frame)
+    if not regions:
+        return None
+
+    # A rotated, zoomed sprite fits in a square of the zoomed template diagonal
+    reach = max_zoom * float(np.hypot(cascade.full_w, cascade.full_h))
+    pad_x = int(np.ceil(max(0.0, reach - cascade.full_w) / 2))
+    pad_y = int(np.ceil(max(0.0, reach - cascade.full_h) / 2))
+    frame_h, frame_w = frame.shape[:2]
+    padded = []
+    for x, y, w, h in regions:
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1, y1 = min(frame_w, x + w + pad_x), min(frame_h, y + h + pad_y)
+        padded.append((x0, y0, x1 - x0, y1 - y0))
+    return padded
+
+
+def find_template_location_features(
+    template_path: str,
+    screenshot_region: Optional[tuple],
+    frame: Optional[np.ndarray] = None,
+    candidates: Optional[List[Tuple[int, int, int, int]]] = None,
+    method: str = "orb",
+    min_inliers: int = MIN_INLIERS
+) -> Optional[tuple]:
+    """
+    Find the template with keypoint matching and a RANSAC similarity transform.
+
+    :param template_path: Template image path
+    :param screenshot_region: (x, y, width, height) region the frame was taken from
+    :param frame: Pre-grabbed BGR frame, grabbed from screenshot_region when None
+    :param candidates: (x, y, width, height) frame rectangles to extract keypoints in, whole frame when None
+    :param method: "orb" or "akaze"
+    :param min_inliers: Minimum RANSAC inliers for a detection
+    :return: (global_x, global_y, h, w, score) with h/w scaled to the detected size, or None.
+             score is the RANSAC inlier ratio of the ratio-test matches.
+    """
+    if frame is None:
+        from utils import grab_frame
+        frame = grab_frame(screenshot_region)
+
+    template_keypoints, template_descriptors, (t_h, t_w) = get_template_features(template_path, method)
+    if template_descriptors is None or len(template_keypoints) < 2:
+        return None
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    mask = _candidate_mask(gray.shape[:2], candidates) if candidates else None
+    frame_keypoints, frame_descriptors = create_feature_extractor(method).detectAndCompute(gray, mask)
+    if frame_descriptors is None or len(frame_keypoints) < 2:
+        return None
+
+    matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+    good = [m for m, n in (pair for pair in matcher.knnMatch(template_descriptors, frame_descriptors, k=2) if len(pair) == 2)
+            if m.distance < RATIO_TEST * n.distance]
+    if len(good) < min_inliers:
+        return None
+
+    src = np.float32([template_keypoints[m.queryIdx].pt for m in good]).reshape(-1, 1, 2)
+    dst = np.float32([frame_keypoints[m.trainIdx].pt for m in good]).reshape(-1, 1, 2)
+    transform, inliers = cv2.estimateAffinePartial2D(src, dst, method=cv2.RANSAC, ransacReprojThreshold=RANSAC_REPROJ_THRESHOLD)
+    if transform is None:
+        return None
+
+    inlier_count = int(inliers.sum())
+    if inlier_count < min_inliers:
+        return None
+
+    center_x, center_y = transform @ np.array([t_w / 2.0, t_h / 2.0, 1.0])
+    scale = float(np.hypot(transform[0, 0], transform[1, 0]))
+    origin_x, origin_y = (screenshot_region[0], screenshot_region[1]) if screenshot_region else (0, 0)
+
+    return (
+        origin_x + int(round(center_x)),
+        origin_y + int(round(center_y)),
+        int(round(t_h * scale)),
+        int(round(t_w * scale)),
+        inlier_count / len(good)
+    )
@@ -0,0 +1,129 @@
+"""
+Non-blocking logging for the farming loop
+
+Log records are put on an in-process queue and formatted/written by a background
+QueueListener thread, so the loop never waits on a slow console.
+
+Messages logged every tick of the farming loop can opt in to rate limiting per message
+template: the first one passes, the rest within the interval are counted and reported
+as "... (x120 in last 60s)" on the next pass. Everything else (recovery stages,
+profiler output, ...) is never suppressed.
+
+Rate limiting keys on the unformatted message, so flagged calls must use lazy
+%-style arguments: logger.info("Found stone at (%d, %d)", x, y, extra=RATE_LIMITED)
+"""
+
+import atexit
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from time import monotonic
+from typing import Dict, Optional, Tuple
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+RATE_LIMIT_INTERVAL = 60.0
+RATE_LIMITED = {'rate_limit': True}  # extra= for hot-loop messages that may be aggregated
+
+_listener: Optional[QueueListener] = None
+_rate_filter: Optional["RateLimitFilter"] = None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let one flagged record per (logger, level, message template) through per interval and count the rest.
+
+    Only records logged with extra=RATE_LIMITED are limited; the lock is re-entrant because
+    a signal handler can log on the main thread while it is inside filter().
+    """
+
+    def __init__(self, interval: float = RATE_LIMIT_INTERVAL, max_level: int = logging.WARNING):
+        super().__init__()
+        self.interval = interval
+        self.max_level = max_level  # ERROR and above are never suppressed
+        self._lock = threading.RLock()
+        self._state: Dict[Tuple[str, int, str], list] = {}  # key -> [window start, suppressed count, last args]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, 'rate_limit', False) or record.levelno > self.max_level or self.interval <= 0:
+            return True
+
+        key = (record.name, record.levelno, str(record.msg))
+        now = monotonic()
+        with self._lock:
+            entry = self._state.get(key)
+            if entry is not None and now - entry[0] < self.interval:
+                entry[1] += 1
+                entry[2] = record.args
+                return False
+            self._state[key] = [now, 0, None]
+
+        if entry is not None and entry[1]:
+            record.msg = f"{record.msg} (x{entry[1] + 1} in last {now - entry[0]:.0f}s)"
+        return True
+
+    def flush_summary(self):
+        """Report messages still suppressed in the current window (called on shutdown)"""
+        now = monotonic()
+        with self._lock:
+            pending = [(key, entry) for key, entry in self._state.items() if entry[1]]
+            self._state.clear()
+
+        for (name, level, msg), (start, count, args) in pending:
+            message = msg % args if args else msg
+            logging.getLogger(name).log(level, "%s (x%d more in last %.0fs)", message, count, now - start)
+
+
+class LazyQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The queue never leaves the process, so the record can travel unformatted
+        return record
+
+
+def setup_async_logging(level: int = logging.INFO, fmt: str = LOG_FORMAT,
+                        rate_limit_interval: float = RATE_LIMIT_INTERVAL) -> QueueListener:
+    """
+    Route root logging through a queue and a background console writer.
+
+    :param level: Root log level
+    :param fmt: Format string for the console handler
+    :param rate_limit_interval: Seconds per RATE_LIMITED message template, 0 disables rate limiting
+    :return: The running QueueListener
+    """
+    global _listener, _rate_filter
+
+    if _listener is not None:
+        return _listener
+
+    log_queue = queue.SimpleQueue()
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(fmt))
+
+    queue_handler = LazyQueueHandler(log_queue)
+    _rate_filter = RateLimitFilter(rate_limit_interval)
+    queue_handler.addFilter(_rate_filter)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, console, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_async_logging)
+    return _listener
+
+
+def stop_async_logging():
+    """Flush rate-limit summaries and drain the queue - safe to call more than once"""
+    global _listener
+
+    if _listener is None:
+        return
+    if _rate_filter is not None:
+        _rate_filter.flush_summary()
+    _listener.stop()
+    _listener = None
@@ -9,17 +9,32 @@ import time
 import signal
 import sys
 import os
+import subprocess
+from enum import IntEnum
 from typing import Optional, Tuple, List, Dict
 import pyautogui
 import win32gui as wn
 import logging
-from utils import click_on_window, find_template_location_colored, bring_window_to_foreground, is_fullscreen, toggle_fullscreen, find_all_template_locations
-from constants import CLICK_DELAY, MAX_WINDOW_WAIT, WINDOW_CHECK_INTERVAL, DEFAULT_CONFIDENCE
+from log_setup import setup_async_logging, RATE_LIMITED
+from utils import click_on_window, find_template_location_colored, bring_window_to_foreground, is_fullscreen, toggle_fullscreen, find_all_template_locations, grab_frame
+from feature_detector import find_template_location_features, feature_candidates
+from probes import ProbeSet
+from profiler import ProfileController
+from constants import CLICK_DELAY, MAX_WINDOW_WAIT, WINDOW_CHECK_INTERVAL, DEFAULT_CONFIDENCE, RECOVERY_BASE_DELAY, RECOVERY_MAX_DELAY, CLIENT_EXECUTABLE, PROBE_SPECS, FEATURE_CANDIDATES
 
-# Configure logging following merchant automation style
-logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
+# Configure logging following merchant automation style - queued, rate limited, written by a background thread
+setup_async_logging(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+class RecoveryStage(IntEnum):
+    """Recovery tiers, cheapest first - StoneBot.recover escalates through them"""
+    RETRY = 0       # Window is fine, just keep scanning
+    REFOCUS = 1     # Bring window to foreground and refresh screen region
+    RERESOLVE = 2   # Look the window handle up again
+    RESTART = 3     # Relaunch the client (only when the window is gone)
+
+
 class StoneBot:
     """Stone farming bot for Metin2 using exact SellMerchant patterns"""
     
@@ -38,16 +53,28 @@ class StoneBot:
             'detections': 0,
             'clicks': 0,
             'failures': 0,
+            'recoveries': 0,
             'start_time': None
         }
         
         # SellMerchant pattern: Configuration with constants
         self.stone_template_path = "ornekresim.png"
+        # Detector per template: "ncc" (template matching) or "orb"/"akaze" (keypoints, rotation/zoom tolerant)
+        self.template_detectors: Dict[str, str] = {self.stone_template_path: "ncc"}
+        
+        # Pixel probes evaluated on every scan frame (see PROBE_SPECS in constants.py)
+        self.probes = ProbeSet.from_specs(PROBE_SPECS)
+        self.probe_state: Dict[str, bool] = {}
+        self.client_offset = (0, 0)  # client area origin inside the captured window frame
         self.scan_interval = 1.0  # Scan every 1 second
         self.click_delay = CLICK_DELAY  # From constants.py (0.5s)
         self.max_failures = 5
         self.consecutive_failures = 0
         
+        # Recovery engine state - consecutive recoveries that needed re-resolve/restart
+        self.recovery_attempts = 0
+        self.client_executable = CLIENT_EXECUTABLE
+        
         # Metin2 window titles for FindWindow
         self.metin2_window_titles = ["Rüya | 1-99", "R�ya | 1-99", "Metin2", "METIN2"]
         
@@ -56,10 +83,14 @@ class StoneBot:
         if not self.hwnd:
             logger.error("Metin2 window not found! Please start Metin2 first.")
         else:
-            logger.info(f"StoneBot initialized with window handle: {self.hwnd}")
+            logger.info("StoneBot initialized with window handle: %s", self.hwnd)
         
         # Setup signal handler for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
+        
+        # On-demand profiler - signal / hotkey / local endpoint, runs alongside the farming loop
+        self.profiler = ProfileController()
+        self.profiler.install()
     
     def _signal_handler(self, signum, frame):
         """Handle Ctrl+C graceful shutdown"""
@@ -75,7 +106,7 @@ class StoneBot:
             for window_title in self.metin2_window_titles:
                 hwnd = wn.FindWindow(None, window_title)
                 if hwnd:
-                    logger.info(f"Found Metin2 window: '{window_title}' (HWND: {hwnd})")
+                    logger.info("Found Metin2 window: '%s' (HWND: %s)", window_title, hwnd)
                     return hwnd
             
             # Fallback: Enumerate windows if direct FindWindow fails
@@ -86,7 +117,7 @@ class StoneBot:
                         # Filter out editor windows
                         if "cursor" not in window_title.lower() and "vs" not in window_title.lower():
                             windows.append((hwnd, window_title))
-                            logger.info(f"Found potential window: '{window_title}' (HWND: {hwnd})")
+                            logger.info("Found potential window: '%s' (HWND: %s)", window_title, hwnd)
                 return True
             
             windows = []
@@ -94,29 +125,131 @@ class StoneBot:
             
             if windows:
                 hwnd, title = windows[0]
-                logger.info(f"Using enumerated window: '{title}' (HWND: {hwnd})")
+                logger.info("Using enumerated window: '%s' (HWND: %s)", title, hwnd)
                 return hwnd
             
             logger.error("No Metin2 window found")
             return None
             
         except Exception as e:
-            logger.error(f"Finding Metin2 window failed: {e}")
+            logger.error("Finding Metin2 window failed: %s", e)
             return None
     
-    def reset_state(self):
-        """Reset bot state - SellMerchant pattern for error recovery"""
-        logger.info("Resetting bot state...")
-        self.__init__()
+    def _window_alive(self) -> bool:
+        """Cheap check that the cached window handle still exists"""
+        try:
+            return bool(self.hwnd) and bool(wn.IsWindow(self.hwnd))
+        except Exception:
+            return False
+    
+    def _recovery_backoff(self, stage: RecoveryStage):
+        """Exponential backoff before the expensive stages, grows with consecutive failing recoveries"""
+        exponent = max(0, self.recovery_attempts - 1 + stage - RecoveryStage.RERESOLVE)
+        delay = min(RECOVERY_BASE_DELAY * (2 ** exponent), RECOVERY_MAX_DELAY)
+        logger.debug("Recovery backoff: %.2fs", delay)
+        time.sleep(delay)
+    
+    def _recover_retry(self) -> bool:
+        """Retry stage - an empty scan streak is normal, keep going if the window is usable as is"""
+        try:
+            return self._window_alive() and not wn.IsIconic(self.hwnd) and wn.GetForegroundWindow() == self.hwnd
+        except Exception:
+            return False
+    
+    def _recover_refocus(self) -> bool:
+        """Refocus stage - bring window back and refresh the cached screen region"""
+        if not self._window_alive():
+            return False
+        try:
+            bring_window_to_foreground(self.hwnd)
+            self.all_screen_region = wn.GetWindowRect(self.hwnd)
+            return True
+        except Exception as e:
+            logger.warning("Refocus failed: %s", e)
+            return False
+    
+    def _recover_reresolve(self) -> bool:
+        """Re-resolve stage - look up the Metin2 window handle again"""
+        hwnd = self._find_metin2_window()
+        if not hwnd:
+            return False
+        if hwnd != self.hwnd:
+            logger.info("Window handle changed: %s -> %s", self.hwnd, hwnd)
+        self.hwnd = hwnd
+        self.all_screen_region = None
+        return True
+    
+    def _recover_restart(self) -> bool:
+        """Restart stage - relaunch the client and wait for its window"""
+        if not self.client_executable:
+            logger.error("Metin2 window is gone and CLIENT_EXECUTABLE is not configured")
+            return False
+        
+        try:
+            logger.warning("Restarting Metin2 client: %s", self.client_executable)
+            subprocess.Popen([self.client_executable], cwd=os.path.dirname(self.client_executable) or None)
+        except Exception as e:
+            logger.error("Client restart failed: %s", e)
+            return False
+        
+        start_time = time.time()
+        while self.running and time.time() - start_time < MAX_WINDOW_WAIT:
+            time.sleep(WINDOW_CHECK_INTERVAL)
+            if self._recover_reresolve():
+                return True
+        
+        logger.error("Metin2 window did not appear within %s seconds", MAX_WINDOW_WAIT)
+        return False
+    
+    def recover(self) -> bool:
+        """Tiered error recovery: retry -> refocus -> re-resolve window -> restart client
+        
+        Each call starts at RETRY and only moves to the next stage when the cheaper one
+        failed, so a healthy window costs a few Win32 calls and no sleep. A dead window
+        handle jumps straight to re-resolve, and the client is only restarted when
+        re-resolving fails. Only re-resolve / restart back off, growing with consecutive
+        recoveries that needed them. Stats and caches are kept intact.
+        """
+        self.stats['recoveries'] += 1
+        
+        actions = {
+            RecoveryStage.RETRY: self._recover_retry,
+            RecoveryStage.REFOCUS: self._recover_refocus,
+            RecoveryStage.RERESOLVE: self._recover_reresolve,
+            RecoveryStage.RESTART: self._recover_restart,
+        }
+        
+        first_stage = RecoveryStage.RETRY if self._window_alive() else RecoveryStage.RERESOLVE
+        escalated = False
+        for stage in RecoveryStage:
+            if stage < first_stage:
+                continue
+            if stage >= RecoveryStage.RERESOLVE:
+                if not escalated:
+                    self.recovery_attempts += 1
+                    escalated = True
+                self._recovery_backoff(stage)
+            
+            logger.info("Recovery stage %s (attempt %s)", stage.name, self.recovery_attempts)
+            if actions[stage]():
+                if stage < RecoveryStage.RERESOLVE:
+                    # Window was fine or came back cheaply - next failure starts from scratch
+                    self.recovery_attempts = 0
+                return True
+        
+        return False
+    
+    def _reset_recovery(self):
+        """Reset recovery engine after a successful tick"""
+        self.recovery_attempts = 0
     
     def ensure_stone_screen_region(self) -> bool:
         """Ensure screen region is valid - SellMerchant pattern"""
         try:
             if not self.hwnd or not wn.IsWindow(self.hwnd):
-                logger.error("Invalid window handle, resetting...")
-                self.hwnd = self._find_metin2_window()
-                if not self.hwnd:
-                    return False
+                # Re-resolving is left to recover(), which backs off instead of searching every tick
+                logger.debug("Invalid window handle, waiting for recovery")
+                return False
             
             # SellMerchant pattern: Bring window to foreground
             bring_window_to_foreground(self.hwnd)
@@ -130,15 +263,20 @@ class StoneBot:
             window_rect = wn.GetWindowRect(self.hwnd)
             self.all_screen_region = window_rect  # SellMerchant uses GetWindowRect directly
             
-            logger.debug(f"Screen region updated: {self.all_screen_region}")
+            # Probes use client coordinates; the window frame also holds the title bar and borders
+            client_left, client_top = wn.ClientToScreen(self.hwnd, (0, 0))
+            self.client_offset = (max(0, client_left - window_rect[0]), max(0, client_top - window_rect[1]))
+            
+            logger.debug("Screen region updated: %s", self.all_screen_region)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to ensure screen region: {e}")
+            logger.error("Failed to ensure screen region: %s", e)
             return False
     
     def find_stone_in_screen(self, stone_name: str = "stone") -> bool:
         """Find stone using SellMerchant template matching pattern"""
+        self.probe_state = {}
         try:
             # SellMerchant pattern: Ensure screen region is valid
             if not self.ensure_stone_screen_region():
@@ -147,14 +285,33 @@ class StoneBot:
             
             # Check if template file exists
             if not os.path.exists(self.stone_template_path):
-                logger.error(f"Template file not found: {self.stone_template_path}")
+                logger.error("Template file not found: %s", self.stone_template_path)
+                return False
+            
+            # One shared frame per scan for pixel probes and the primary detector
+            frame = grab_frame(self.all_screen_region)
+            offset_x, offset_y = self.client_offset
+            self.probe_state = self.probes.evaluate(frame[offset_y:, offset_x:])
+            if self.probe_state.get('TARGET_HP_BAR'):
+                logger.debug("Target HP bar visible - stone already under attack, skipping scan", extra=RATE_LIMITED)
                 return False
             
-            # SellMerchant pattern: Primary detection with find_template_location_colored
-            stone_detection = find_template_location_colored(
-                template_path=self.stone_template_path,
-                screenshot_region=self.all_screen_region
-            )
+            # SellMerchant pattern: Primary detection with the detector configured for this template
+            detector = self.template_detectors.get(self.stone_template_path, "ncc")
+            if detector == "ncc":
+                stone_detection = find_template_location_colored(
+                    template_path=self.stone_template_path,
+                    screenshot_region=self.all_screen_region,
+                    frame=frame
+                )
+            else:
+                stone_detection = find_template_location_features(
+                    template_path=self.stone_template_path,
+                    screenshot_region=self.all_screen_region,
+                    frame=frame,
+                    candidates=feature_candidates(self.stone_template_path, frame) if FEATURE_CANDIDATES else None,
+                    method=detector
+                )
             
             if stone_detection:
                 # SellMerchant format: (global_x, global_y, h, w, max_val)
@@ -164,11 +321,15 @@ class StoneBot:
                 self.stone_locations[stone_name] = [stone_detection]
                 
                 self.stats['detections'] += 1
-                logger.info(f"Found stone at ({center_x}, {center_y}) - confidence: {confidence:.3f}")
+                logger.info("Found stone at (%s, %s) - confidence: %.3f", center_x, center_y, confidence, extra=RATE_LIMITED)
                 return True
+            elif detector != "ncc":
+                # Keypoint detectors already handle rotation/zoom, threshold descent would not help
+                logger.debug("No stones detected with %s detector", detector, extra=RATE_LIMITED)
+                return False
             else:
                 # SellMerchant pattern: Try fallback method with find_all_template_locations
-                logger.debug("Primary detection failed, trying find_all_template_locations...")
+                logger.debug("Primary detection failed, trying find_all_template_locations...", extra=RATE_LIMITED)
                 
                 stone_locations = find_all_template_locations(
                     template_path=self.stone_template_path,
@@ -179,14 +340,14 @@ class StoneBot:
                     # SellMerchant pattern: Store all detections
                     self.stone_locations[stone_name] = stone_locations
                     self.stats['detections'] += len(stone_locations)
-                    logger.info(f"Found {len(stone_locations)} stones with fallback method")
+                    logger.info("Found %s stones with fallback method", len(stone_locations), extra=RATE_LIMITED)
                     return True
                 else:
-                    logger.debug("No stones detected with either method")
+                    logger.debug("No stones detected with either method", extra=RATE_LIMITED)
                     return False
             
         except Exception as e:
-            logger.error(f"Stone detection failed: {e}", exc_info=True)
+            logger.error("Stone detection failed: %s", e, exc_info=True)
             return False
     
     
@@ -194,6 +355,8 @@ class StoneBot:
 
     def process_single_stone(self, stone_name: str = "stone") -> bool:
         """Process single stone click - SellMerchant pattern from process_single_item"""
+        # Probe results belong to this tick only; an early return must not leave TARGET_HP_BAR set
+        self.probe_state = {}
         try:
             # SellMerchant pattern: Ensure screen region is valid
             if not self.ensure_stone_screen_region():
@@ -202,12 +365,12 @@ class StoneBot:
             
             # SellMerchant pattern: Find stone in screen (like find_item_in_inventory)
             if not self.find_stone_in_screen(stone_name):
-                logger.debug(f"Stone '{stone_name}' not found")
+                logger.debug("Stone '%s' not found", stone_name, extra=RATE_LIMITED)
                 return False
             
             # SellMerchant pattern: Get cached location and process
             if stone_name not in self.stone_locations or not self.stone_locations[stone_name]:
-                logger.error(f"No cached location for stone '{stone_name}'")
+                logger.error("No cached location for stone '%s'", stone_name)
                 return False
             
             # SellMerchant pattern: Get first detection from cache
@@ -216,7 +379,7 @@ class StoneBot:
             
             # SellMerchant pattern: Move mouse to target (like process_sell_item line 168)
             pyautogui.moveTo(center_x, center_y)
-            logger.debug(f"Mouse moved to stone at ({center_x}, {center_y})")
+            logger.debug("Mouse moved to stone at (%s, %s)", center_x, center_y, extra=RATE_LIMITED)
             
             # FIX: click_on_window expects CLIENT coordinates, but we have SCREEN coordinates
             # Convert screen coordinates to client coordinates for click_on_window
@@ -228,37 +391,37 @@ class StoneBot:
                 client_x = center_x - window_rect[0]
                 client_y = center_y - window_rect[1]
                 
-                logger.debug(f"Screen coords: ({center_x}, {center_y}) -> Client coords: ({client_x}, {client_y})")
+                logger.debug("Screen coords: (%s, %s) -> Client coords: (%s, %s)", center_x, center_y, client_x, client_y, extra=RATE_LIMITED)
                 
                 # SellMerchant pattern: Click using click_on_window with CLIENT coordinates
                 success = click_on_window(self.hwnd, x=client_x, y=client_y, click_times=1)
                 
             except Exception as coord_error:
-                logger.warning(f"Coordinate conversion failed: {coord_error}, trying direct click...")
+                logger.warning("Coordinate conversion failed: %s, trying direct click...", coord_error)
                 
                 # Fallback: Direct pyautogui click at screen coordinates
                 try:
                     pyautogui.click(center_x, center_y)
                     success = True
-                    logger.debug("Fallback pyautogui click successful")
+                    logger.debug("Fallback pyautogui click successful", extra=RATE_LIMITED)
                 except Exception as click_error:
-                    logger.error(f"Direct click also failed: {click_error}")
+                    logger.error("Direct click also failed: %s", click_error)
                     success = False
             
             if success:
                 self.stats['clicks'] += 1
-                logger.info(f"Successfully clicked stone at ({center_x}, {center_y}) - confidence: {confidence:.3f}")
+                logger.info("Successfully clicked stone at (%s, %s) - confidence: %.3f", center_x, center_y, confidence, extra=RATE_LIMITED)
                 
                 # SellMerchant pattern: Apply click delay from constants
                 time.sleep(self.click_delay)
                 return True
             else:
-                logger.error(f"Click failed at ({center_x}, {center_y})")
+                logger.error("Click failed at (%s, %s)", center_x, center_y)
                 self.stats['failures'] += 1
                 return False
             
         except Exception as e:
-            logger.error(f"Process single stone failed: {e}", exc_info=True)
+            logger.error("Process single stone failed: %s", e, exc_info=True)
             self.stats['failures'] += 1
             return False
     
@@ -295,24 +458,23 @@ class StoneBot:
                 success = self.process_single_stone(stone_name)
                 
                 if success:
-                    logger.info("Successfully processed stone")
+                    logger.info("Successfully processed stone", extra=RATE_LIMITED)
                     self.consecutive_failures = 0  # Reset failure counter
+                    self._reset_recovery()
+                elif self.probe_state.get('TARGET_HP_BAR'):
+                    # Busy with a stone, not a failure
+                    logger.debug("Stone already targeted, waiting", extra=RATE_LIMITED)
                 else:
-                    logger.debug("Stone processing failed")
+                    logger.debug("Stone processing failed", extra=RATE_LIMITED)
                     self.consecutive_failures += 1
                     
-                    # SellMerchant pattern: Reset state on consecutive failures
+                    # Tiered recovery on consecutive failures
                     if self.consecutive_failures >= self.max_failures:
-                        logger.warning(f"Too many consecutive failures ({self.max_failures}), resetting state...")
-                        self.reset_state()
-                        
-                        # Check if reset was successful
-                        if not self.hwnd:
-                            logger.error("Reset failed - no window handle. Stopping bot.")
+                        logger.warning("Too many consecutive failures (%s), starting recovery...", self.max_failures)
+                        if not self.recover():
+                            logger.error("Recovery failed - no window handle. Stopping bot.")
                             break
-                        else:
-                            logger.info("State reset successful, continuing...")
-                            self.consecutive_failures = 0
+                        self.consecutive_failures = 0
                 
                 # SellMerchant pattern: Wait between operations
                 time.sleep(self.scan_interval)
@@ -321,16 +483,15 @@ class StoneBot:
                 logger.info("Keyboard interrupt received")
                 break
             except Exception as e:
-                logger.error(f"Unexpected error in farming loop: {e}", exc_info=True)
+                logger.error("Unexpected error in farming loop: %s", e, exc_info=True)
                 self.stats['failures'] += 1
                 self.consecutive_failures += 1
                 
-                # SellMerchant pattern: Reset on persistent errors
+                # Tiered recovery on persistent errors
                 if self.consecutive_failures >= self.max_failures:
-                    logger.error("Too many consecutive errors, resetting state...")
-                    self.reset_state()
-                    if not self.hwnd:
-                        logger.error("Reset failed after errors. Stopping bot.")
+                    logger.error("Too many consecutive errors, starting recovery...")
+                    if not self.recover():
+                        logger.error("Recovery failed after errors. Stopping bot.")
                         break
                     self.consecutive_failures = 0
                 
@@ -342,6 +503,7 @@ class StoneBot:
     def cleanup(self):
         """Cleanup and show final statistics - SellMerchant pattern"""
         self.running = False
+        self.profiler.shutdown()
         
         if self.stats['start_time']:
             runtime = time.time() - self.stats['start_time']
@@ -350,6 +512,7 @@ class StoneBot:
             logger.info(f"Detections: {self.stats['detections']}")
             logger.info(f"Clicks: {self.stats['clicks']}")
             logger.info(f"Failures: {self.stats['failures']}")
+            logger.info(f"Recoveries: {self.stats['recoveries']}")
             
             if self.stats['detections'] > 0:
                 success_rate = (self.stats['clicks'] / self.stats['detections']) * 100
@@ -0,0 +1,127 @@
+"""
+Pixel probes - cheap UI state checks without template matching
+
+A probe is a named set of points / small rectangles with an expected BGR color and
+tolerance, e.g. "is the stone HP bar visible" or "is the OK dialog open". All probes
+of a ProbeSet are evaluated with one NumPy fancy-index gather on the shared frame,
+which takes microseconds instead of a matchTemplate / locateOnScreen call.
+
+Coordinates are relative to the frame a ProbeSet is evaluated on. StoneBot crops its
+window capture to the client area first, so PROBE_SPECS use client coordinates (the
+same ones click_on_window takes), independent of the title bar and border size.
+
+Spec format (see PROBE_SPECS in constants.py):
+    'OK_DIALOG': {
+        'samples': [(x, y), (x, y, w, h), (x, y, (b, g, r))],  # points, rects, optional per-sample color
+        'color': (b, g, r),
+        'tolerance': 30,       # max abs difference per channel
+        'min_ratio': 0.8       # fraction of sampled pixels that must match
+    }
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class Probe:
+    """Named group of sample pixels with expected colors"""
+
+    def __init__(self, name: str, samples: Sequence[tuple], color: Tuple[int, int, int] = (0, 0, 0),
+                 tolerance: int = 30, min_ratio: float = 1.0):
+        self.name = name
+        self.tolerance = tolerance
+        self.min_ratio = min_ratio
+
+        xs, ys, colors = [], [], []
+        for sample in samples:
+            sample_color = color
+            if len(sample) in (3, 5):
+                *sample, sample_color = sample
+            if len(sample) == 2:
+                x, y = sample
+                xs.append(x)
+                ys.append(y)
+                colors.append(sample_color)
+            elif len(sample) == 4:
+                x, y, w, h = sample
+                grid_y, grid_x = np.mgrid[y:y + h, x:x + w]
+                xs.extend(grid_x.ravel().tolist())
+                ys.extend(grid_y.ravel().tolist())
+                colors.extend([sample_color] * (w * h))
+            else:
+                raise ValueError(f"Probe {name}: sample must be (x, y) or (x, y, w, h), got {sample}")
+
+        if not xs:
+            raise ValueError(f"Probe {name} has no samples")
+
+        self.xs = np.array(xs, dtype=np.intp)
+        self.ys = np.array(ys, dtype=np.intp)
+        self.colors = np.array(colors, dtype=np.int16).reshape(-1, 3)
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        """Center of the sample bounding box, used as click point when a probe resolves a wait"""
+        return (int(self.xs.min() + self.xs.max()) // 2, int(self.ys.min() + self.ys.max()) // 2)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """(h, w) of the sample bounding box"""
+        return (int(self.ys.max() - self.ys.min()) + 1, int(self.xs.max() - self.xs.min()) + 1)
+
+
+class ProbeSet:
+    """Compiles many probes into flat index arrays so they are evaluated in a single gather"""
+
+    def __init__(self, probes: List[Probe]):
+        self.probes = list(probes)
+        self.names = [probe.name for probe in self.probes]
+        if not self.probes:
+            return
+
+        self.xs = np.concatenate([probe.xs for probe in self.probes])
+        self.ys = np.concatenate([probe.ys for probe in self.probes])
+        self.colors = np.concatenate([probe.colors for probe in self.probes])
+        self.tolerances = np.concatenate([np.full(len(probe.xs), probe.tolerance, dtype=np.int16) for probe in self.probes])
+        self.owners = np.concatenate([np.full(len(probe.xs), i, dtype=np.intp) for i, probe in enumerate(self.probes)])
+        self.counts = np.bincount(self.owners, minlength=len(self.probes))
+        self.min_ratios = np.array([probe.min_ratio for probe in self.probes])
+
+    @classmethod
+    def from_specs(cls, specs: Dict[str, dict]) -> "ProbeSet":
+        """Build a ProbeSet from the PROBE_SPECS dictionary format"""
+        return cls([Probe(name, **spec) for name, spec in specs.items()])
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.names
+
+    def __bool__(self) -> bool:
+        return bool(self.probes)
+
+    def get(self, name: str) -> Optional[Probe]:
+        for probe in self.probes:
+            if probe.name == name:
+                return probe
+        return None
+
+    def evaluate(self, frame: np.ndarray) -> Dict[str, bool]:
+        """
+        Evaluate every probe on a BGR frame.
+
+        :param frame: BGR frame, probe coordinates are relative to its top-left corner
+        :return: {probe name: matched}; samples outside the frame count as misses
+        """
+        return dict(zip(self.names, self.evaluate_all(frame).tolist()))
+
+    def evaluate_all(self, frame: np.ndarray) -> np.ndarray:
+        """Evaluate every probe on a BGR frame, return a bool array in probe order"""
+        if not self.probes:
+            return np.zeros(0, dtype=bool)
+
+        h, w = frame.shape[:2]
+        inside = (self.xs < w) & (self.ys < h) & (self.xs >= 0) & (self.ys >= 0)
+        pixels = frame[np.minimum(self.ys, h - 1), np.minimum(self.xs, w - 1), :3].astype(np.int16)
+
+        matched = (np.abs(pixels - self.colors) <= self.tolerances[:, None]).all(axis=1) & inside
+        ratios = np.bincount(self.owners, weights=matched, minlength=len(self.probes)) / self.counts
+        return ratios >= self.min_ratios
@@ -0,0 +1,276 @@
+"""
+On-demand sampling profiler - diagnose a slow session without restarting it
+
+A profile session samples the Python stacks of every thread (the farming loop, tiled
+match workers, the log listener) from a background thread for N seconds and writes
+them in folded format, one "thread;frame;frame count" line per unique stack:
+
+    flamegraph.pl profiles/profile-20250101-120000-123.folded > profile.svg
+    (or drop the file into speedscope.app)
+
+At the same time tracemalloc records allocations; the top allocation sites and the
+growth since the session started go next to the stacks in a .tracemalloc.txt file.
+
+Sessions are toggled at runtime - a second trigger stops the running session early:
+    - signal:   kill -USR1 <pid> (Ctrl+Break / SIGBREAK on Windows)
+    - hotkey:   PROFILE_HOTKEY, polled with GetAsyncKeyState (Windows only)
+    - endpoint: GET http://127.0.0.1:<PROFILE_CONTROL_PORT>/profile?seconds=30, /status
+The bot keeps running the whole time; only the sampler thread does extra work.
+"""
+
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from constants import (PROFILE_DURATION, PROFILE_INTERVAL, PROFILE_OUTPUT_DIR, PROFILE_TRACEMALLOC_FRAMES,
+                       PROFILE_TOP_ALLOCATIONS, PROFILE_HOTKEY, PROFILE_CONTROL_PORT)
+
+logger = logging.getLogger(__name__)
+
+# Virtual key codes for PROFILE_HOTKEY names
+VIRTUAL_KEYS = {f"F{i}": 0x6F + i for i in range(1, 13)}
+VIRTUAL_KEYS.update({'PAUSE': 0x13, 'SCROLL': 0x91})
+HOTKEY_POLL_INTERVAL = 0.1
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class ProfileSession:
+    """One sampling + tracemalloc run; sampling happens on its own daemon thread"""
+
+    def __init__(self, duration: float, interval: float = PROFILE_INTERVAL, output_dir: str = PROFILE_OUTPUT_DIR):
+        self.duration = duration
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started = time.time()
+        self.overhead = 0.0
+
+        os.makedirs(output_dir, exist_ok=True)
+        stamp = time.strftime("profile-%Y%m%d-%H%M%S", time.localtime(self.started)) + f"-{int(self.started * 1000) % 1000:03d}"
+        base = os.path.join(output_dir, stamp)
+        suffix = 1
+        while os.path.exists(base + ".folded"):
+            # Toggles within the same millisecond must not overwrite the previous session
+            base = os.path.join(output_dir, f"{stamp}-{suffix}")
+            suffix += 1
+        self.folded_path = base + ".folded"
+        self.memory_path = base + ".tracemalloc.txt"
+
+        self._stop = threading.Event()
+        self._owns_tracemalloc = not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+        self._baseline = tracemalloc.take_snapshot()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def stop(self):
+        """Stop early; the session still writes its output"""
+        self._stop.set()
+
+    def join(self, timeout: Optional[float] = None):
+        self._thread.join(timeout)
+
+    def _sample(self, own_id: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + self.duration
+        try:
+            while not self._stop.is_set() and time.monotonic() < deadline:
+                start = time.perf_counter()
+                self._sample(own_id)
+                self.overhead += time.perf_counter() - start
+                self._stop.wait(self.interval)
+            self._write()
+        except Exception as e:
+            logger.error("Profile session failed: %s", e, exc_info=True)
+        finally:
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+
+    def _write(self):
+        with open(self.folded_path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        with open(self.memory_path, "w", encoding="utf-8") as f:
+            f.write(f"traced: {current / 1024 ** 2:.1f} MiB (peak {peak / 1024 ** 2:.1f} MiB)\n")
+            f.write(f"\nTop {PROFILE_TOP_ALLOCATIONS} allocation sites:\n")
+            for stat in snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]:
+                f.write(f"  {stat}\n")
+            f.write(f"\nTop {PROFILE_TOP_ALLOCATIONS} growth since session start:\n")
+            for stat in snapshot.compare_to(self._baseline, "lineno")[:PROFILE_TOP_ALLOCATIONS]:
+                f.write(f"  {stat}\n")
+
+        elapsed = time.time() - self.started
+        logger.info("Profile written: %s (%d samples in %.1fs, sampler overhead %.1f%%), memory: %s",
+                    self.folded_path, self.samples, elapsed, 100 * self.overhead / max(elapsed, 1e-9),
+                    self.memory_path)
+
+
+class ProfileController:
+    """Starts/stops profile sessions from any trigger; at most one session runs at a time"""
+
+    def __init__(self, duration: float = PROFILE_DURATION, interval: float = PROFILE_INTERVAL,
+                 output_dir: str = PROFILE_OUTPUT_DIR):
+        self.duration = duration
+        self.interval = interval
+        self.output_dir = output_dir
+        self.session: Optional[ProfileSession] = None
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._hotkey_stop = threading.Event()
+
+    def start(self, duration: Optional[float] = None) -> Optional[ProfileSession]:
+        """Start a session unless one is running; returns the new session or None"""
+        with self._lock:
+            if self.session is not None and self.session.running:
+                return None
+            self.session = ProfileSession(duration or self.duration, self.interval, self.output_dir)
+        logger.info("Profiling for %.0fs -> %s", self.session.duration, self.session.folded_path)
+        return self.session
+
+    def stop(self) -> bool:
+        """Stop the running session early, returns False when nothing was running"""
+        session = self.session
+        if session is None or not session.running:
+            return False
+        session.stop()
+        return True
+
+    def toggle(self, duration: Optional[float] = None):
+        if not self.stop():
+            self.start(duration)
+
+    def status(self) -> Dict[str, object]:
+        session = self.session
+        if session is None:
+            return {'running': False}
+        return {
+            'running': session.running,
+            'samples': session.samples,
+            'elapsed': round(time.time() - session.started, 1),
+            'duration': session.duration,
+            'folded': session.folded_path,
+            'memory': session.memory_path,
+        }
+
+    # --- Triggers ---
+
+    def install_signal(self) -> Optional[int]:
+        """Toggle on SIGUSR1 (POSIX) or SIGBREAK (Windows, Ctrl+Break); must be called from the main thread"""
+        signum = getattr(signal, "SIGUSR1", None) or getattr(signal, "SIGBREAK", None)
+        if signum is None:
+            return None
+        # The handler only starts/stops a thread, so it is safe between any two bytecodes of the loop
+        signal.signal(signum, lambda *_: self.toggle())
+        logger.info("Profiler: send %s to pid %d to toggle profiling", signal.Signals(signum).name, os.getpid())
+        return signum
+
+    def install_hotkey(self, key: str = PROFILE_HOTKEY) -> bool:
+        """Toggle when the hotkey is pressed; polls GetAsyncKeyState, so the game keeps its input"""
+        try:
+            import win32api
+        except ImportError:
+            logger.warning("Profiler hotkey needs pywin32, hotkey disabled")
+            return False
+        vk = VIRTUAL_KEYS.get(key.upper())
+        if vk is None:
+            raise ValueError(f"Unknown profiler hotkey: {key} (expected one of {', '.join(VIRTUAL_KEYS)})")
+
+        def poll():
+            was_down = False
+            while not self._hotkey_stop.wait(HOTKEY_POLL_INTERVAL):
+                down = bool(win32api.GetAsyncKeyState(vk) & 0x8000)
+                if down and not was_down:
+                    self.toggle()
+                was_down = down
+
+        threading.Thread(target=poll, name="profiler-hotkey", daemon=True).start()
+        logger.info("Profiler: press %s to toggle profiling", key)
+        return True
+
+    def serve(self, port: int = PROFILE_CONTROL_PORT) -> ThreadingHTTPServer:
+        """Local control endpoint on 127.0.0.1 only: /profile[?seconds=N], /stop, /status"""
+        controller = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/profile":
+                    seconds = parse_qs(url.query).get("seconds", [None])[0]
+                    session = controller.start(float(seconds) if seconds else None)
+                    code = 200 if session else 409
+                elif url.path == "/stop":
+                    code = 200 if controller.stop() else 409
+                elif url.path == "/status":
+                    code = 200
+                else:
+                    code = 404
+                body = json.dumps(controller.status()).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("Profiler endpoint: " + format, *args)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="profiler-http", daemon=True).start()
+        logger.info("Profiler: control endpoint on http://127.0.0.1:%d/profile", self._server.server_address[1])
+        return self._server
+
+    def install(self, hotkey: Optional[str] = PROFILE_HOTKEY, port: Optional[int] = PROFILE_CONTROL_PORT):
+        """Install every configured trigger; None disables hotkey / endpoint"""
+        self.install_signal()
+        if hotkey:
+            self.install_hotkey(hotkey)
+        if port is not None:
+            self.serve(port)
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop triggers, finish a running session so its output is written"""
+        self._hotkey_stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self.stop():
+            self.session.join(timeout)
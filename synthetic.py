@@ -0,0 +1,245 @@
+"""
+Synthetic scene generator - load and accuracy testing without the game
+
+Composites templates (using their alpha channel) into background images with random
+count, scale, rotation, brightness, occlusion and noise, and returns every frame with
+exact ground-truth boxes. Only needs OpenCV/NumPy, so it runs on Linux and feeds the
+frame based detectors in detection.py / feature_detector.py directly.
+
+    generator = SceneGenerator({"stone": "ornekresim.png"}, 3840, 2160, count=50)
+    frame, boxes = generator.generate()          # boxes: [(name, x, y, w, h), ...]
+    print(measure(my_detector, generator, frames=20))
+"""
+
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+Range = Union[float, Tuple[float, float]]
+Box = Tuple[str, int, int, int, int]
+
+BACKGROUND_POOL = 4
+NOISE_POOL = 2
+NOISE_REFERENCE_SIGMA = 8.0
+PLACEMENT_ATTEMPTS = 50
+
+
+def _sample(value: Range, rng: np.random.Generator) -> float:
+    if isinstance(value, (tuple, list)):
+        return float(rng.uniform(value[0], value[1]))
+    return float(value)
+
+
+def make_background(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    """Smooth colored noise, roughly like terrain"""
+    small = rng.integers(0, 255, (height // 16 + 1, width // 16 + 1, 3), dtype=np.uint8)
+    background = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+    noise = rng.normal(0, 8, background.shape)
+    return np.clip(background + noise, 0, 255).astype(np.uint8)
+
+
+def make_texture_background(width: int, height: int, rng: np.random.Generator, cell: int = 4) -> np.ndarray:
+    """Hard-edged grey random blocks - dense corners everywhere, the worst case for keypoint detectors"""
+    small = rng.integers(0, 255, (height // cell + 1, width // cell + 1), dtype=np.uint8)
+    gray = cv2.resize(small, ((width // cell + 1) * cell, (height // cell + 1) * cell), interpolation=cv2.INTER_NEAREST)
+    return cv2.cvtColor(gray[:height, :width], cv2.COLOR_GRAY2BGR)
+
+
+def transform_template(template: np.ndarray, angle: float, scale: float) -> np.ndarray:
+    """Rotate/scale a BGRA template into a canvas that fits it; transparent outside"""
+    h, w = template.shape[:2]
+    if angle == 0:
+        # No warp for the common case - keeps pixels exact instead of a half-pixel resample
+        if scale == 1:
+            return template.copy()
+        size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+        return cv2.resize(template, size, interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, scale)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    out_w, out_h = int(h * sin + w * cos) + 1, int(h * cos + w * sin) + 1
+    matrix[0, 2] += out_w / 2 - w / 2
+    matrix[1, 2] += out_h / 2 - h / 2
+    return cv2.warpAffine(template, matrix, (out_w, out_h), flags=cv2.INTER_LINEAR, borderValue=(0, 0, 0, 0))
+
+
+def _overlaps(box: Tuple[int, int, int, int], boxes: List[Box]) -> bool:
+    x, y, w, h = box
+    return any(x < bx + bw and bx < x + w and y < by + bh and by < y + h for _, bx, by, bw, bh in boxes)
+
+
+class SceneGenerator:
+    """
+    Random scenes with ground truth.
+
+    Every parameter given as (low, high) is sampled per frame (count) or per placed
+    template (the rest); a single number is used as is.
+
+    :param templates: {name: template path}; RGB templates are treated as fully opaque
+    :param width: Frame width
+    :param height: Frame height
+    :param count: Templates per frame
+    :param scale: Template scale
+    :param rotation: Template rotation in degrees
+    :param brightness: Multiplier for template pixels
+    :param occlusion: Share of each box covered by a background patch
+    :param noise: Gaussian noise sigma added to the whole frame
+    :param backgrounds: Background image paths or BGR arrays, procedural terrain when None
+    :param seed: Random seed
+    """
+
+    def __init__(self, templates: Dict[str, str], width: int = 1920, height: int = 1080,
+                 count: Range = (1, 5), scale: Range = 1.0, rotation: Range = 0.0,
+                 brightness: Range = (0.8, 1.2), occlusion: Range = (0.0, 0.1), noise: Range = (0.0, 6.0),
+                 backgrounds: Optional[Sequence[Union[str, np.ndarray]]] = None, seed: int = 0):
+        self.width, self.height = width, height
+        self.count, self.scale, self.rotation = count, scale, rotation
+        self.brightness, self.occlusion, self.noise = brightness, occlusion, noise
+        self.rng = np.random.default_rng(seed)
+
+        self.templates: Dict[str, np.ndarray] = {}
+        for name, path in templates.items():
+            template = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+            if template is None:
+                raise FileNotFoundError(f"Template image not found: {path}")
+            if template.ndim == 2:
+                template = cv2.cvtColor(template, cv2.COLOR_GRAY2BGRA)
+            elif template.shape[2] == 3:
+                template = cv2.cvtColor(template, cv2.COLOR_BGR2BGRA)
+            self.templates[name] = template
+
+        # Backgrounds are built once and reused, so generation cost is mostly compositing
+        if backgrounds:
+            self.backgrounds = []
+            for path in backgrounds:
+                image = path if isinstance(path, np.ndarray) else cv2.imread(path, cv2.IMREAD_COLOR)
+                if image is None:
+                    raise FileNotFoundError(f"Background image not found: {path}")
+                self.backgrounds.append(cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA))
+        else:
+            self.backgrounds = [make_background(width, height, self.rng) for _ in range(BACKGROUND_POOL)]
+
+        # Gaussian noise is the most expensive part at 4K, so reference fields are drawn once and scaled per frame
+        self._noise_fields: List[np.ndarray] = []
+
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, List[Box]]]:
+        while True:
+            yield self.generate()
+
+    def generate(self) -> Tuple[np.ndarray, List[Box]]:
+        """
+        Build one frame.
+
+        :return: (BGR frame, [(name, x, y, w, h), ...]) with boxes in frame coordinates.
+                 Templates that could not be placed without overlap are skipped.
+        """
+        rng = self.rng
+        background = self.backgrounds[int(rng.integers(len(self.backgrounds)))]
+        frame = background.copy()
+        names = list(self.templates)
+
+        boxes: List[Box] = []
+        for _ in range(int(round(_sample(self.count, rng)))):
+            name = names[int(rng.integers(len(names)))]
+            sprite = transform_template(self.templates[name], _sample(self.rotation, rng), _sample(self.scale, rng))
+            h, w = sprite.shape[:2]
+            if w >= self.width or h >= self.height:
+                continue
+
+            for _ in range(PLACEMENT_ATTEMPTS):
+                x, y = int(rng.integers(0, self.width - w)), int(rng.integers(0, self.height - h))
+                if not _overlaps((x, y, w, h), boxes):
+                    break
+            else:
+                continue
+
+            alpha = sprite[:, :, 3:4].astype(np.float32) / 255.0
+            color = np.clip(sprite[:, :, :3].astype(np.float32) * _sample(self.brightness, rng), 0, 255)
+            roi = frame[y:y + h, x:x + w]
+            roi[:] = (color * alpha + roi * (1.0 - alpha)).astype(np.uint8)
+
+            occluded = _sample(self.occlusion, rng)
+            if occluded > 0:
+                # Cover a strip from a random side with the untouched background
+                if rng.random() < 0.5:
+                    size = int(w * occluded)
+                    ox = x if rng.random() < 0.5 else x + w - size
+                    frame[y:y + h, ox:ox + size] = background[y:y + h, ox:ox + size]
+                else:
+                    size = int(h * occluded)
+                    oy = y if rng.random() < 0.5 else y + h - size
+                    frame[oy:oy + size, x:x + w] = background[oy:oy + size, x:x + w]
+
+            boxes.append((name, x, y, w, h))
+
+        sigma = _sample(self.noise, rng)
+        if sigma > 0:
+            if not self._noise_fields:
+                self._noise_fields = [
+                    (rng.standard_normal(frame.shape, dtype=np.float32) * NOISE_REFERENCE_SIGMA).astype(np.int16)
+                    for _ in range(NOISE_POOL)
+                ]
+            noise = self._noise_fields[int(rng.integers(NOISE_POOL))]
+            frame = cv2.addWeighted(frame, 1.0, noise, sigma / NOISE_REFERENCE_SIGMA, 0, dtype=cv2.CV_8U)
+        return frame, boxes
+
+
+def _iou(a: Tuple[float, float, float, float], b: Tuple[float, float, float, float]) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    overlap_x = max(0.0, min(ax + aw, bx + bw) - max(ax, bx))
+    overlap_y = max(0.0, min(ay + ah, by + bh) - max(ay, by))
+    overlap = overlap_x * overlap_y
+    return overlap / (aw * ah + bw * bh - overlap)
+
+
+def match_detections(detections: List[tuple], truths: List[Box], iou_threshold: float = 0.3) -> Tuple[int, int, int]:
+    """
+    Greedy one-to-one matching of detections to ground truth.
+
+    :param detections: [(center_x, center_y, w, h, score), ...] - find_all_template_locations format
+    :param truths: [(name, x, y, w, h), ...] from SceneGenerator.generate
+    :return: (true positives, false positives, false negatives)
+    """
+    remaining = [(x, y, w, h) for _, x, y, w, h in truths]
+    true_positives = 0
+    for center_x, center_y, w, h, _ in sorted(detections, key=lambda d: d[4], reverse=True):
+        box = (center_x - w / 2, center_y - h / 2, w, h)
+        scores = [_iou(box, truth) for truth in remaining]
+        if scores and max(scores) >= iou_threshold:
+            remaining.pop(int(np.argmax(scores)))
+            true_positives += 1
+    return true_positives, len(detections) - true_positives, len(remaining)
+
+
+def measure(detector: Callable[[np.ndarray], List[tuple]], generator: SceneGenerator, frames: int = 20,
+            iou_threshold: float = 0.3) -> Dict[str, float]:
+    """
+    Run a detector on generated frames and report accuracy and latency.
+
+    :param detector: frame -> [(center_x, center_y, w, h, score), ...]; wrap single-result
+                     detectors as lambda frame: [r] if r else []
+    :return: {'precision', 'recall', 'mean_ms', 'p95_ms', 'generate_ms'}
+    """
+    totals = np.zeros(3, dtype=np.int64)
+    latencies, generation = [], []
+    for _ in range(frames):
+        start = time.perf_counter()
+        frame, truths = generator.generate()
+        generation.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        detections = detector(frame)
+        latencies.append(time.perf_counter() - start)
+        totals += match_detections(detections, truths, iou_threshold)
+
+    true_positives, false_positives, false_negatives = totals.tolist()
+    return {
+        'precision': true_positives / max(true_positives + false_positives, 1),
+        'recall': true_positives / max(true_positives + false_negatives, 1),
+        'mean_ms': float(np.mean(latencies)) * 1000,
+        'p95_ms': float(np.percentile(latencies, 95)) * 1000,
+        'generate_ms': float(np.mean(generation)) * 1000,
+    }
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Template optimizer - smaller, cheaper templates that still separate stones from the rest
+
+Matching cost grows with template area times frame area, and a captured template is
+mostly background. The optimizer analyzes a template against sample frames and picks
+the cheapest variant that still separates true matches from everything else:
+
+  crop   smallest discriminative sub-region (sizes from 100% down to 40% of each side)
+  scale  lowest scale of frame and template that keeps the score margin
+  mask   stone pixels from GrabCut, or from pixel stability across real occurrences;
+         masked-out pixels are filled with the stone mean, so they drop out of the
+         template side of TM_CCOEFF_NORMED (zero deviation from the template mean) and
+         the match stays a single fast matchTemplate call. The frame side still
+         counts the background under them in the window variance, so they are
+         damped rather than ignored - a real mask= match would be several times slower
+
+For every candidate the true score is the minimum over known stone positions and the
+false score the maximum anywhere else in the frames; margin = true - false. Candidates
+are tried lowest scale first, then smallest crop; the first with margin >= --min-margin
+wins and its speedup is measured against the full template.
+
+Output next to the template, loaded automatically by find_template_location_colored:
+  ornekresim.optimized.png   cropped/scaled/mean-filled BGR
+  ornekresim.optimized.json  crop, scale, threshold (middle of the margin), scores, speedup
+
+Sample frames: real screenshots (--frames; stones found with the full template) and/or
+synthetic scenes (--synthetic N, optionally on real stone-free --backgrounds). The chosen
+template is then reported on --holdout N synthetic scenes from a different seed, which
+the search never saw; benchmark.py warns when its seed overlaps the tuning scenes.
+
+Usage: python template_optimizer.py ornekresim.png [--frames shot1.png ...] [--synthetic 8]
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from cascade import CascadeFilter
+from constants import CASCADE_FILTERING
+from detection import (find_all_template_locations_in_frame, match_optimized_in_frame, optimized_paths,
+                       file_digest)
+from synthetic import SceneGenerator
+
+CROP_SIZES = (1.0, 0.8, 0.65, 0.5, 0.4)      # share of template width/height
+CROP_STRIDE = 8                              # crop positions per side: template size / CROP_STRIDE apart
+CROPS_PER_SIZE = 3                           # most textured crops kept per size
+SCALES = (1.0, 0.75, 0.5, 0.375, 0.25)
+MIN_MARGIN = 0.15
+MIN_SIZE = 8                                 # smallest scaled template side in pixels
+TRUE_THRESHOLD = 0.8                         # full-template score for a stone in a real sample frame
+PEAK_RADIUS = 2                              # true score = best score this close to the expected position
+TIMING_REPEATS = 3
+DEFAULT_SEED = 1000                          # away from benchmark.py's default seed 0
+HOLDOUT_SEED_OFFSET = 1                      # held-out scenes use seed + this
+
+Crop = Tuple[int, int, int, int]
+Truths = List[Tuple[int, int]]               # template top-left positions in one frame
+
+
+def derive_mask(template: np.ndarray, occurrences: List[np.ndarray]) -> Tuple[np.ndarray, str]:
+    """
+    Stone pixel mask.
+
+    :param template: BGR or BGRA template
+    :param occurrences: Aligned BGR crops of the template from real frames
+    :return: (bool mask, method name)
+    """
+    if template.shape[2] == 4 and (template[:, :, 3] < 255).any():
+        return template[:, :, 3] > 0, "alpha"
+
+    bgr = np.ascontiguousarray(template[:, :, :3])
+    if len(occurrences) >= 3:
+        # Background changes between occurrences, the stone does not
+        stack = np.stack([cv2.cvtColor(o, cv2.COLOR_BGR2GRAY) for o in occurrences]).astype(np.float32)
+        spread = stack.std(axis=0)
+        return spread <= max(float(np.median(spread)), 1.0), "stability"
+
+    h, w = bgr.shape[:2]
+    mask = np.zeros((h, w), dtype=np.uint8)
+    rect = (int(w * 0.06), int(h * 0.06), int(w * 0.88), int(h * 0.88))
+    cv2.grabCut(bgr, mask, rect, np.zeros((1, 65)), np.zeros((1, 65)), 5, cv2.GC_INIT_WITH_RECT)
+    return (mask == cv2.GC_FGD) | (mask == cv2.GC_PR_FGD), "grabcut"
+
+
+def candidate_crops(template: np.ndarray, mask: np.ndarray) -> List[Crop]:
+    """Per crop size, the positions with the most textured stone pixels (cheap pre-ranking)"""
+    h, w = template.shape[:2]
+    gray = cv2.cvtColor(template[:, :, :3], cv2.COLOR_BGR2GRAY).astype(np.float32)
+    crops = []
+    for size in CROP_SIZES:
+        cw, ch = max(MIN_SIZE, int(w * size)), max(MIN_SIZE, int(h * size))
+        step_x, step_y = max(1, w // CROP_STRIDE), max(1, h // CROP_STRIDE)
+        scored = []
+        for y in range(0, h - ch + 1, step_y):
+            for x in range(0, w - cw + 1, step_x):
+                inside = mask[y:y + ch, x:x + cw]
+                if not inside.any():
+                    continue
+                texture = float(gray[y:y + ch, x:x + cw][inside].std())
+                scored.append((texture * inside.mean(), (x, y, cw, ch)))
+        scored.sort(reverse=True)
+        crops.extend(crop for _, crop in scored[:CROPS_PER_SIZE])
+    return list(dict.fromkeys(crops))
+
+
+def build_template(template: np.ndarray, mask: np.ndarray, crop: Crop, scale: float, masked: bool) -> np.ndarray:
+    """BGR candidate: crop, fill masked-out pixels with the stone mean, resize"""
+    x, y, w, h = crop
+    candidate = template[y:y + h, x:x + w, :3].copy()
+    inside = mask[y:y + h, x:x + w]
+    if masked and inside.any() and not inside.all():
+        candidate[~inside] = candidate[inside].mean(axis=0).round().astype(np.uint8)
+    if scale != 1:
+        size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+        candidate = cv2.resize(candidate, size, interpolation=cv2.INTER_AREA)
+    return candidate
+
+
+def scaled_frame(frame: np.ndarray, scale: float) -> np.ndarray:
+    return frame if scale == 1 else cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+def evaluate(candidate: np.ndarray, crop: Crop, scale: float, frames: List[Dict[float, np.ndarray]],
+             truths: List[Truths]) -> Tuple[float, float]:
+    """(min true score, max false score) of one candidate over all sample frames"""
+    h, w = candidate.shape[:2]
+    true_scores, false_score = [], -1.0
+    for pyramid, positions in zip(frames, truths):
+        result = cv2.matchTemplate(pyramid[scale], candidate, cv2.TM_CCOEFF_NORMED)
+        out_h, out_w = result.shape
+        for tx, ty in positions:
+            ex = min(max(int(round((tx + crop[0]) * scale)), 0), out_w - 1)
+            ey = min(max(int(round((ty + crop[1]) * scale)), 0), out_h - 1)
+            near = result[max(ey - PEAK_RADIUS, 0):ey + PEAK_RADIUS + 1, max(ex - PEAK_RADIUS, 0):ex + PEAK_RADIUS + 1]
+            true_scores.append(float(near.max()))
+            # Within half a crop of the stone the click still lands on it, so that is not a false match
+            result[max(ey - h // 2, 0):ey + h // 2 + 1, max(ex - w // 2, 0):ex + w // 2 + 1] = -1
+        false_score = max(false_score, float(result.max()))
+    return (min(true_scores) if true_scores else 1.0), false_score
+
+
+def match_cost(frame_shape: tuple, template_shape: tuple, scale: float) -> float:
+    """Median seconds for resize + matchTemplate at this scale, on random data of the sample frame shape"""
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, frame_shape, dtype=np.uint8)
+    template = rng.integers(0, 255, template_shape[:2] + (3,), dtype=np.uint8)
+    times = []
+    for _ in range(TIMING_REPEATS):
+        start = time.perf_counter()
+        cv2.matchTemplate(scaled_frame(frame, scale), template, cv2.TM_CCOEFF_NORMED)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def load_samples(template_path: str, template: np.ndarray, frame_paths: List[str], synthetic: int,
+                 backgrounds: Optional[List[str]], width: int, height: int, seed: int):
+    """Sample frames with known template top-left positions, plus aligned real occurrences for the mask"""
+    frames, truths, occurrences = [], [], []
+    bgr = np.ascontiguousarray(template[:, :, :3])
+    h, w = bgr.shape[:2]
+    for path in frame_paths:
+        frame = cv2.imread(path, cv2.IMREAD_COLOR)
+        if frame is None:
+            raise FileNotFoundError(f"Sample frame not found: {path}")
+        found = find_all_template_locations_in_frame(frame, bgr, threshold=TRUE_THRESHOLD)
+        positions = [(cx - w // 2, cy - h // 2) for cx, cy, _, _, _ in found]
+        occurrences.extend(frame[y:y + h, x:x + w] for x, y in positions)
+        frames.append(frame)
+        truths.append(positions)
+
+    if synthetic:
+        synthetic_frames, synthetic_truths = synthetic_samples(template_path, synthetic, backgrounds, width, height, seed)
+        frames.extend(synthetic_frames)
+        truths.extend(synthetic_truths)
+    return frames, truths, occurrences
+
+
+def synthetic_samples(template_path: str, count: int, backgrounds: Optional[List[str]], width: int, height: int,
+                      seed: int) -> Tuple[List[np.ndarray], List[Truths]]:
+    generator = SceneGenerator({"template": template_path}, width, height, backgrounds=backgrounds, seed=seed)
+    frames, truths = [], []
+    for _ in range(count):
+        frame, boxes = generator.generate()
+        frames.append(frame)
+        truths.append([(x, y) for _, x, y, _, _ in boxes])
+    return frames, truths
+
+
+def runtime_check(frames: List[np.ndarray], truths: List[Truths], candidate: np.ndarray, meta: dict,
+                  cascade: Optional[CascadeFilter]) -> Tuple[int, int]:
+    """(frames whose best match is a stone, frames with stones) through the bot's matcher"""
+    w, h = meta["source_size"]
+    hits = frames_with_stones = 0
+    for frame, positions in zip(frames, truths):
+        if not positions:
+            continue
+        frames_with_stones += 1
+        match = match_optimized_in_frame(frame, candidate, meta, None, cascade=cascade)
+        if match is not None and any(abs(match[0] - (x + w // 2)) <= w // 4 and abs(match[1] - (y + h // 2)) <= h // 4
+                                     for x, y in positions):
+            hits += 1
+    return hits, frames_with_stones
+
+
+def optimize(template_path: str, frame_paths: List[str], synthetic: int = 8, backgrounds: Optional[List[str]] = None,
+             width: int = 1920, height: int = 1080, min_margin: float = MIN_MARGIN, seed: int = DEFAULT_SEED,
+             holdout: int = 8, write: bool = True) -> Optional[dict]:
+    """
+    Search crop/scale/mask candidates and write the cheapest one that keeps min_margin.
+
+    :return: Metadata of the chosen candidate, or None when even the full template misses min_margin
+    """
+    template = cv2.imread(template_path, cv2.IMREAD_UNCHANGED)
+    if template is None:
+        raise FileNotFoundError(f"Template image not found: {template_path}")
+    if template.ndim == 2:
+        template = cv2.cvtColor(template, cv2.COLOR_GRAY2BGR)
+    h, w = template.shape[:2]
+
+    frames, truths, occurrences = load_samples(template_path, template, frame_paths, synthetic, backgrounds,
+                                               width, height, seed)
+    if not frames or not any(truths):
+        raise ValueError("No sample frames with stones - pass --frames containing the template or --synthetic N")
+    mask, mask_method = derive_mask(template, occurrences)
+    pyramids = [{scale: scaled_frame(frame, scale) for scale in SCALES} for frame in frames]
+    frame_shape = frames[0].shape
+
+    # Cheapest first (cost grows with both scale and crop area); stops at the first (crop, scale) that keeps the margin
+    full = (0, 0, w, h)
+    shapes = [(crop, scale) for crop in candidate_crops(template, mask) for scale in SCALES
+              if min(crop[2], crop[3]) * scale >= MIN_SIZE]
+    shapes.sort(key=lambda s: (s[1], s[0][2] * s[0][3]))
+
+    baseline_true, baseline_false = evaluate(build_template(template, mask, full, 1.0, False), full, 1.0, pyramids, truths)
+    baseline_cost = match_cost(frame_shape, (h, w), 1.0)
+    print(f"full template {w}x{h}: true {baseline_true:.3f}  false {baseline_false:.3f}  "
+          f"margin {baseline_true - baseline_false:+.3f}  {baseline_cost * 1000:.1f} ms/frame "
+          f"({len(frames)} frames, {sum(map(len, truths))} stones, mask: {mask_method} {mask.mean():.0%})")
+
+    best = None
+    for crop, scale in shapes:
+        for masked in (False, True):
+            candidate = build_template(template, mask, crop, scale, masked)
+            true_score, false_score = evaluate(candidate, crop, scale, pyramids, truths)
+            if true_score - false_score >= min_margin and (best is None or true_score - false_score > best[4] - best[5]):
+                best = (crop, scale, masked, candidate, true_score, false_score)
+        if best is not None:
+            break
+    if best is None:
+        print(f"No candidate keeps a margin of {min_margin} - template left unchanged")
+        return None
+
+    crop, scale, masked, candidate, true_score, false_score = best
+    cost = match_cost(frame_shape, candidate.shape[:2], scale)
+    meta = {
+        "source": template_path,
+        "source_sha1": file_digest(template_path),
+        "source_size": [w, h],
+        "crop": list(crop),
+        "scale": scale,
+        "masked": masked,
+        "mask_method": mask_method,
+        "threshold": round((true_score + false_score) / 2, 4),
+        "true_score": round(true_score, 4),
+        "false_score": round(false_score, 4),
+        "margin": round(true_score - false_score, 4),
+        "baseline_margin": round(baseline_true - baseline_false, 4),
+        "speedup": round(baseline_cost / cost, 2),
+        "frames": len(frames),
+        "synthetic_seeds": [seed] if synthetic else [],
+    }
+
+    # Runtime path check: the same function and cascade setting the bot uses must find the sample stones;
+    # find_template_location_colored only runs the cascade on unscaled optimized templates
+    cascade = CascadeFilter.from_path(template_path) if CASCADE_FILTERING and scale == 1 else None
+    hits, frames_with_stones = runtime_check(frames, truths, candidate, meta, cascade)
+    print(f"optimized {candidate.shape[1]}x{candidate.shape[0]} (crop {crop}, scale {scale}, mask {masked}): "
+          f"true {true_score:.3f}  false {false_score:.3f}  margin {true_score - false_score:+.3f}  "
+          f"{cost * 1000:.1f} ms/frame  expected speedup x{meta['speedup']:.1f}  "
+          f"runtime check {hits}/{frames_with_stones} frames")
+
+    # Held-out scenes: nothing above was tuned on them
+    if holdout:
+        holdout_seed = seed + HOLDOUT_SEED_OFFSET
+        holdout_frames, holdout_truths = synthetic_samples(template_path, holdout, backgrounds, width, height, holdout_seed)
+        holdout_pyramids = [{scale: scaled_frame(frame, scale)} for frame in holdout_frames]
+        holdout_true, holdout_false = evaluate(candidate, crop, scale, holdout_pyramids, holdout_truths)
+        holdout_hits, holdout_with_stones = runtime_check(holdout_frames, holdout_truths, candidate, meta, cascade)
+        meta.update({
+            "holdout_seed": holdout_seed,
+            "holdout_true_score": round(holdout_true, 4),
+            "holdout_false_score": round(holdout_false, 4),
+            "holdout_margin": round(holdout_true - holdout_false, 4),
+            "holdout_hits": [holdout_hits, holdout_with_stones],
+        })
+        print(f"held-out (seed {holdout_seed}, {holdout} frames): true {holdout_true:.3f}  false {holdout_false:.3f}  "
+              f"margin {holdout_true - holdout_false:+.3f}  threshold {meta['threshold']:.3f}  "
+              f"runtime check {holdout_hits}/{holdout_with_stones} frames")
+        if holdout_hits < holdout_with_stones or holdout_true < meta["threshold"]:
+            print("WARNING: the optimized template misses held-out stones - add real --frames / --backgrounds "
+                  "or raise --min-margin")
+
+    if write:
+        image_path, meta_path = optimized_paths(template_path)
+        cv2.imwrite(image_path, candidate)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        print(f"wrote {image_path}, {meta_path}")
+    return meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("template")
+    parser.add_argument("--frames", nargs="*", default=[], help="real sample screenshots")
+    parser.add_argument("--synthetic", type=int, default=8, help="synthetic sample frames")
+    parser.add_argument("--backgrounds", nargs="*", help="stone-free screenshots for the synthetic frames")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--min-margin", type=float, default=MIN_MARGIN)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="synthetic tuning scenes")
+    parser.add_argument("--holdout", type=int, default=8, help="held-out synthetic frames for the report (seed + 1)")
+    parser.add_argument("--dry-run", action="store_true", help="report only, do not write files")
+    args = parser.parse_args()
+
+    meta = optimize(args.template, args.frames, args.synthetic, args.backgrounds, args.width, args.height,
+                    args.min_margin, args.seed, args.holdout, write=not args.dry_run)
+    sys.exit(0 if meta is not None else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TEMPLATE_PATH = os.path.join(ROOT, "ornekresim.png")
+
+
+@pytest.fixture
+def template_path():
+    return TEMPLATE_PATH
+
+
+@pytest.fixture
+def scenes():
+    """One stone per frame on fixed-seed 960x540 scenes: [(frame, [(name, x, y, w, h)]), ...]"""
+    from synthetic import SceneGenerator
+    generator = SceneGenerator({"stone": TEMPLATE_PATH}, 960, 540, count=1, seed=7)
+    return [generator.generate() for _ in range(10)]
@@ -0,0 +1,34 @@
+import cv2
+import numpy as np
+
+from cascade import CascadeFilter
+from detection import find_template_location_colored, load_template
+
+
+def _hit(detection, box):
+    _, x, y, w, h = box
+    return detection is not None and np.hypot(detection[0] - (x + w / 2), detection[1] - (y + h / 2)) <= max(w, h) / 2
+
+
+def test_mask_has_match_result_shape_and_keeps_the_stone(scenes, template_path):
+    cascade = CascadeFilter.from_path(template_path)
+    template = load_template(template_path)
+    for frame, boxes in scenes[:3]:
+        _, x, y, _, _ = boxes[0]
+        mask = cascade.candidate_mask(frame)
+        assert mask.shape == cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED).shape
+        assert mask[y, x]
+
+
+def test_cascade_recall_not_below_full_ncc(scenes, template_path):
+    full = cascaded = 0
+    for frame, boxes in scenes:
+        full += _hit(find_template_location_colored(template_path, None, frame=frame, tiled=False, cascade=False,
+                                                    optimized=False), boxes[0])
+        cascaded += _hit(find_template_location_colored(template_path, None, frame=frame, tiled=False, cascade=True,
+                                                        optimized=False), boxes[0])
+    assert cascaded >= full == len(scenes)
+
+
+def test_empty_frame_has_no_candidates(template_path):
+    assert CascadeFilter.from_path(template_path).candidate_regions(np.zeros((540, 960, 3), dtype=np.uint8)) == []
@@ -0,0 +1,38 @@
+import numpy as np
+
+from cascade import CascadeFilter
+from feature_detector import feature_candidates, find_template_location_features
+from synthetic import SceneGenerator
+
+
+def test_candidates_are_padded_for_zoom_and_clipped(template_path, monkeypatch):
+    cascade = CascadeFilter.from_path(template_path)
+    # One survivor region exactly the template size, one touching the frame corner
+    monkeypatch.setattr(cascade, "candidate_regions", lambda frame: [(300, 200, cascade.full_w, cascade.full_h),
+                                                                     (0, 0, cascade.full_w, cascade.full_h)])
+    frame = np.zeros((540, 960, 3), np.uint8)
+
+    assert feature_candidates(template_path, frame, max_zoom=0) == cascade.candidate_regions(frame)
+
+    (x, y, w, h), corner = feature_candidates(template_path, frame, max_zoom=1.3)
+    reach = 1.3 * np.hypot(cascade.full_w, cascade.full_h)
+    assert w >= reach and h >= reach
+    assert (x + w / 2, y + h / 2) == (300 + cascade.full_w / 2, 200 + cascade.full_h / 2)
+    assert corner[:2] == (0, 0) and corner[2] < w and corner[3] < h
+
+
+def test_no_candidates_means_whole_frame(template_path):
+    assert feature_candidates(template_path, np.zeros((540, 960, 3), np.uint8)) is None
+
+
+def test_orb_finds_transformed_stone(template_path):
+    generator = SceneGenerator({"stone": template_path}, 960, 540, count=1, rotation=(-30, 30),
+                               scale=(0.8, 1.2), seed=5)
+    hits = 0
+    for _ in range(10):
+        frame, boxes = generator.generate()
+        _, x, y, w, h = boxes[0]
+        detection = find_template_location_features(template_path, (100, 200, 960, 540), frame=frame)
+        if detection and np.hypot(detection[0] - 100 - (x + w / 2), detection[1] - 200 - (y + h / 2)) <= max(w, h) / 2:
+            hits += 1
+    assert hits >= 8
@@ -0,0 +1,51 @@
+import logging
+import threading
+
+from log_setup import RATE_LIMITED, RateLimitFilter
+
+
+def _record(msg, *args, level=logging.INFO, limited=True):
+    record = logging.LogRecord("bot", level, __file__, 1, msg, args, None)
+    if limited:
+        record.__dict__.update(RATE_LIMITED)
+    return record
+
+
+def test_unflagged_messages_are_never_suppressed():
+    rate_filter = RateLimitFilter(interval=60)
+    for attempt in range(5):
+        assert rate_filter.filter(_record("Recovery stage %s (attempt %s)", "REFOCUS", attempt, limited=False))
+
+
+def test_repeats_of_a_flagged_template_are_aggregated():
+    rate_filter = RateLimitFilter(interval=60)
+    assert rate_filter.filter(_record("Found stone at (%s, %s)", 1, 2))
+    assert not rate_filter.filter(_record("Found stone at (%s, %s)", 3, 4))
+    assert not rate_filter.filter(_record("Found stone at (%s, %s)", 5, 6))
+    assert rate_filter.filter(_record("Other message"))
+    assert rate_filter.filter(_record("Found stone at (%s, %s)", 7, 8, level=logging.ERROR))
+
+
+def test_summary_reports_suppressed_count(caplog):
+    rate_filter = RateLimitFilter(interval=60)
+    for x in range(4):
+        rate_filter.filter(_record("Found stone at (%s, %s)", x, 0))
+    with caplog.at_level(logging.INFO, logger="bot"):
+        rate_filter.flush_summary()
+    assert "Found stone at (3, 0) (x3 more" in caplog.text
+
+
+def test_filter_is_reentrant_on_the_same_thread():
+    # A signal handler that logs runs on the thread that may already be inside filter()
+    rate_filter = RateLimitFilter(interval=60)
+    done = threading.Event()
+
+    def nested():
+        with rate_filter._lock:
+            rate_filter.filter(_record("Found stone at (%s, %s)", 1, 2))
+        done.set()
+
+    thread = threading.Thread(target=nested, daemon=True)
+    thread.start()
+    thread.join(1)
+    assert done.is_set()
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from probes import Probe, ProbeSet
+
+
+def test_gather_matches_points_and_rects():
+    frame = np.zeros((100, 200, 3), dtype=np.uint8)
+    frame[10:20, 30:40] = (0, 0, 255)
+    probes = ProbeSet([
+        Probe("RED_RECT", [(30, 10, 10, 10)], color=(0, 0, 250), tolerance=10),
+        Probe("RED_POINT_MIXED", [(35, 15), (150, 50, (0, 0, 255))], min_ratio=0.5, color=(0, 0, 255)),
+        Probe("OUTSIDE", [(500, 500)], color=(0, 0, 0)),
+    ])
+    assert probes.evaluate(frame) == {"RED_RECT": True, "RED_POINT_MIXED": True, "OUTSIDE": False}
+
+    frame[12, 32] = 0
+    assert probes.evaluate(frame)["RED_RECT"] is False
+
+
+def test_probe_geometry():
+    probe = Probe("BAR", [(10, 20, 5, 3)])
+    assert probe.center == (12, 21) and probe.size == (3, 5)
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    pytest.importorskip("win32gui")
+    pytest.importorskip("pyautogui")
+    import log_setup
+    import metin2_stone_bot
+    from metin2_stone_bot import StoneBot
+
+    # Window frame at (100, 50); the client area starts below an 8px border and 30px title bar
+    window = {"alive": True}
+    monkeypatch.setattr(metin2_stone_bot.wn, "IsWindow", lambda hwnd: window["alive"])
+    monkeypatch.setattr(metin2_stone_bot.wn, "GetWindowRect", lambda hwnd: (100, 50, 300, 250))
+    monkeypatch.setattr(metin2_stone_bot.wn, "ClientToScreen", lambda hwnd, point: (108, 88), raising=False)
+    monkeypatch.setattr(metin2_stone_bot, "bring_window_to_foreground", lambda hwnd: True)
+    monkeypatch.setattr(metin2_stone_bot, "is_fullscreen", lambda hwnd: False)
+    frame = np.zeros((200, 200, 3), dtype=np.uint8)
+    frame[38 + 5, 8 + 10] = (0, 0, 255)  # client pixel (10, 5)
+    monkeypatch.setattr(metin2_stone_bot, "grab_frame", lambda region: frame)
+
+    instance = StoneBot.__new__(StoneBot)
+    instance.hwnd = 1
+    instance.stone_template_path = __file__
+    instance.probes = ProbeSet([Probe("TARGET_HP_BAR", [(10, 5)], color=(0, 0, 255))])
+    instance.probe_state = {}
+    instance.client_offset = (0, 0)
+    yield instance, window
+    log_setup.stop_async_logging()
+
+
+def test_bot_probes_use_client_coordinates(bot):
+    instance, _ = bot
+    assert instance.find_stone_in_screen() is False
+    assert instance.client_offset == (8, 38)
+    assert instance.probe_state == {"TARGET_HP_BAR": True}
+
+
+def test_probe_state_does_not_outlive_a_failed_tick(bot):
+    instance, window = bot
+    instance.probe_state = {"TARGET_HP_BAR": True}
+    window["alive"] = False
+    assert instance.process_single_stone() is False
+    assert instance.probe_state == {}
@@ -0,0 +1,55 @@
+import json
+import os
+import time
+from urllib.request import urlopen
+
+from profiler import ProfileController, ProfileSession
+
+
+def _busy(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        sum(range(1000))
+
+
+def test_session_writes_stacks_and_allocations(tmp_path):
+    controller = ProfileController(duration=10, interval=0.001, output_dir=str(tmp_path))
+    session = controller.start()
+    assert session is not None and controller.start() is None  # one session at a time
+
+    _busy(0.1)
+    assert controller.stop()
+    session.join(5)
+
+    assert not session.running and session.samples > 0
+    with open(session.folded_path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("_busy (test_profiler.py" in line for line in lines)
+    with open(session.memory_path, encoding="utf-8") as f:
+        assert f.readline().startswith("traced:")
+
+
+def test_back_to_back_sessions_do_not_overwrite(tmp_path):
+    first = ProfileSession(0.01, 0.001, str(tmp_path))
+    first.join(5)
+    second = ProfileSession(0.01, 0.001, str(tmp_path))
+    second.join(5)
+    assert first.folded_path != second.folded_path
+    assert os.path.exists(first.folded_path) and os.path.exists(second.folded_path)
+
+
+def test_control_endpoint(tmp_path):
+    controller = ProfileController(duration=10, interval=0.001, output_dir=str(tmp_path))
+    server = controller.serve(port=0)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urlopen(f"{base}/status", timeout=5) as response:
+            assert json.load(response) == {"running": False}
+        with urlopen(f"{base}/profile?seconds=10", timeout=5) as response:
+            status = json.load(response)
+        assert status["running"] and status["duration"] == 10
+    finally:
+        controller.shutdown()
+    assert not controller.session.running
+    assert os.path.exists(controller.session.folded_path)
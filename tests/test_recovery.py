@@ -0,0 +1,67 @@
+import pytest
+
+pytest.importorskip("win32gui")
+pytest.importorskip("pyautogui")
+
+import log_setup
+import metin2_stone_bot
+from metin2_stone_bot import StoneBot
+
+
+@pytest.fixture(scope="module", autouse=True)
+def drain_bot_logging():
+    """The bot module starts async logging on import; flush it while pytest's capture is still open"""
+    yield
+    log_setup.stop_async_logging()
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    window = {"alive": True, "foreground": True}
+    monkeypatch.setattr(metin2_stone_bot.wn, "IsWindow", lambda hwnd: window["alive"])
+    monkeypatch.setattr(metin2_stone_bot.wn, "IsIconic", lambda hwnd: False)
+    monkeypatch.setattr(metin2_stone_bot.wn, "GetForegroundWindow", lambda: 1 if window["foreground"] else 2)
+    monkeypatch.setattr(metin2_stone_bot.wn, "GetWindowRect", lambda hwnd: (0, 0, 800, 600))
+    monkeypatch.setattr(metin2_stone_bot, "bring_window_to_foreground",
+                        lambda hwnd: window.update(foreground=True, refocused=window.get("refocused", 0) + 1))
+    monkeypatch.setattr(StoneBot, "_find_metin2_window", lambda self: window.update(searched=window.get("searched", 0) + 1))
+    sleeps = []
+    monkeypatch.setattr(metin2_stone_bot.time, "sleep", sleeps.append)
+
+    instance = StoneBot.__new__(StoneBot)
+    instance.hwnd = 1
+    instance.running = True
+    instance.stats = {"recoveries": 0}
+    instance.recovery_attempts = 0
+    instance.client_executable = None
+    return instance, window, sleeps
+
+
+def test_healthy_window_stays_at_retry_without_sleeping(bot):
+    instance, window, sleeps = bot
+    assert all(instance.recover() for _ in range(12))
+    assert instance.recovery_attempts == 0 and sleeps == []
+    assert "refocused" not in window and "searched" not in window
+
+
+def test_background_window_is_refocused_without_backoff(bot):
+    instance, window, sleeps = bot
+    window["foreground"] = False
+    assert instance.recover()
+    assert window["refocused"] == 1 and "searched" not in window and sleeps == []
+
+
+def test_dead_window_escalates_with_growing_backoff(bot):
+    instance, window, sleeps = bot
+    window["alive"] = False
+    assert not instance.recover()
+    assert not instance.recover()
+    assert instance.recovery_attempts == 2
+    assert sleeps == sorted(sleeps) and sleeps[-1] > sleeps[0]
+
+
+def test_invalid_handle_leaves_re_resolving_to_recover(bot):
+    instance, window, _ = bot
+    window["alive"] = False
+    assert not instance.ensure_stone_screen_region()
+    assert "searched" not in window
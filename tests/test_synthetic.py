@@ -0,0 +1,33 @@
+import numpy as np
+
+from synthetic import SceneGenerator, match_detections, transform_template
+
+
+def test_ground_truth_boxes_hold_the_template(template_path):
+    generator = SceneGenerator({"stone": template_path}, 640, 480, count=3, brightness=1.0,
+                               occlusion=0.0, noise=0.0, seed=1)
+    frame, boxes = generator.generate()
+    template = generator.templates["stone"]
+    assert boxes
+    for _, x, y, w, h in boxes:
+        assert (w, h) == (template.shape[1], template.shape[0])
+        assert np.array_equal(frame[y:y + h, x:x + w], template[:, :, :3])
+
+
+def test_same_seed_same_scenes(template_path):
+    first = SceneGenerator({"stone": template_path}, 320, 240, seed=3).generate()
+    second = SceneGenerator({"stone": template_path}, 320, 240, seed=3).generate()
+    assert np.array_equal(first[0], second[0]) and first[1] == second[1]
+
+
+def test_transform_without_rotation_keeps_pixels(template_path):
+    generator = SceneGenerator({"stone": template_path}, 320, 240)
+    template = generator.templates["stone"]
+    assert np.array_equal(transform_template(template, 0, 1), template)
+    assert transform_template(template, 0, 0.5).shape[:2] == (62, 64)
+
+
+def test_match_detections_counts():
+    truths = [("stone", 0, 0, 10, 10), ("stone", 50, 50, 10, 10)]
+    detections = [(5, 5, 10, 10, 0.9), (200, 200, 10, 10, 0.8)]
+    assert match_detections(detections, truths) == (1, 1, 1)
@@ -0,0 +1,45 @@
+import cv2
+import numpy as np
+import pytest
+
+from cascade import CascadeFilter
+from detection import match_optimized_in_frame
+from template_optimizer import build_template, derive_mask
+
+
+@pytest.mark.parametrize("crop, scale", [((48, 15, 51, 49), 0.25), ((20, 10, 80, 90), 0.5), ((32, 15, 83, 80), 1.0)])
+def test_optimized_match_returns_true_center(scenes, template_path, crop, scale):
+    template = cv2.imread(template_path, cv2.IMREAD_UNCHANGED)
+    h, w = template.shape[:2]
+    mask, _ = derive_mask(template, [])
+    candidate = build_template(template, mask, crop, scale, False)
+    meta = {"crop": list(crop), "scale": scale, "source_size": [w, h], "threshold": 0.3}
+    cascade = CascadeFilter.from_path(template_path) if scale == 1 else None
+
+    for frame, boxes in scenes[:5]:
+        _, x, y, _, _ = boxes[0]
+        match = match_optimized_in_frame(frame, candidate, meta, (100, 200, 960, 540), cascade=cascade)
+        assert match is not None
+        center_x, center_y, match_h, match_w, _ = match
+        assert (match_h, match_w) == (h, w)
+        tolerance = max(1, int(np.ceil(1 / scale)))
+        assert abs(center_x - (100 + x + w // 2)) <= tolerance
+        assert abs(center_y - (200 + y + h // 2)) <= tolerance
+
+
+def test_grabcut_mask_covers_the_stone_not_the_border(template_path):
+    mask, method = derive_mask(cv2.imread(template_path, cv2.IMREAD_UNCHANGED), [])
+    assert method == "grabcut"
+    assert mask[mask.shape[0] // 2, mask.shape[1] // 2]
+    assert not mask[0, 0] and 0.2 < mask.mean() < 0.8
+
+
+def test_masked_candidate_is_mean_filled_bgr(template_path):
+    template = cv2.imread(template_path, cv2.IMREAD_UNCHANGED)
+    mask, _ = derive_mask(template, [])
+    crop = (0, 0, template.shape[1], template.shape[0])
+    candidate = build_template(template, mask, crop, 1.0, True)
+    assert candidate.shape == template.shape[:2] + (3,)
+    fill = template[:, :, :3][mask].mean(axis=0).round()
+    assert np.array_equal(candidate[~mask], np.broadcast_to(fill, candidate[~mask].shape))
+    assert np.array_equal(candidate[mask], template[:, :, :3][mask])
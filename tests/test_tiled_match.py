@@ -0,0 +1,35 @@
+import cv2
+import numpy as np
+
+import tiled_match
+
+
+def test_tiled_map_equals_single_call(scenes):
+    frame, boxes = scenes[0]
+    _, x, y, w, h = boxes[0]
+    template = np.ascontiguousarray(frame[y:y + h, x:x + w])
+
+    expected = cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED)
+    tiled = tiled_match.match_template_tiled(frame, template, tile_size=256, workers=2)
+
+    assert tiled.shape == expected.shape
+    assert np.abs(tiled - expected).max() < 1e-5
+    assert cv2.minMaxLoc(tiled)[3] == cv2.minMaxLoc(expected)[3] == (x, y)
+
+
+def test_untuned_shape_does_not_block(monkeypatch):
+    calls = []
+    monkeypatch.setattr(tiled_match, "_tuner", type("Tuner", (), {"submit": lambda self, *args: calls.append(args)})())
+    monkeypatch.setattr(tiled_match, "_tuning", {})
+    monkeypatch.setattr(tiled_match, "_pending", set())
+
+    image = np.zeros((300, 500, 3), dtype=np.uint8)
+    template = np.zeros((20, 20, 3), dtype=np.uint8)
+    assert tiled_match.tuned_or_schedule(image.shape, template.shape) is None
+    assert tiled_match.tuned_or_schedule(image.shape, template.shape) is None
+    assert len(calls) == 1  # queued once, single call used meanwhile
+
+
+def test_window_resize_within_bucket_reuses_tuning():
+    key = tiled_match._tuning_key((1080, 1920, 3), (124, 129, 3), cv2.TM_CCOEFF_NORMED)
+    assert tiled_match._tuning_key((1060, 1900, 3), (124, 129, 3), cv2.TM_CCOEFF_NORMED) == key
@@ -0,0 +1,64 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+pytest.importorskip("win32gui")
+pytest.importorskip("pyautogui")
+
+import utils
+
+REGION = (0, 0, 64, 48)
+MATCH = ("OK_BUTTON", (10, 10, 5, 5, 0.9))
+
+
+@pytest.fixture
+def screen(monkeypatch):
+    """Counts grabs; the condition matches once `ready` is set"""
+    state = {"grabs": 0, "ready_after": 1}
+
+    def grab_frame(region=None):
+        state["grabs"] += 1
+        return np.zeros((48, 64, 3), np.uint8)
+
+    def match_conditions(frame, waiters, region):
+        return {index: MATCH for index in range(len(waiters))} if state["grabs"] >= state["ready_after"] else {}
+
+    monkeypatch.setattr(utils, "grab_frame", grab_frame)
+    monkeypatch.setattr(utils, "match_conditions", match_conditions)
+    return state
+
+
+def test_waiters_are_kept_per_event_loop(screen):
+    # Each asyncio.run has its own loop; the second one has to wait between grabs, which
+    # fails if it reuses the first loop's waiter and its asyncio.Event
+    assert asyncio.run(utils.wait_for_any_async({"OK_BUTTON": "ok.png"}, region=REGION, timeout=1)) == MATCH
+    screen["ready_after"] = screen["grabs"] + 2
+    assert asyncio.run(utils.wait_for_any_async({"OK_BUTTON": "ok.png"}, region=REGION, timeout=1)) == MATCH
+
+
+def test_concurrent_waiters_share_one_grab(screen):
+    async def both():
+        return await asyncio.gather(
+            utils.wait_for_any_async({"OK_BUTTON": "ok.png"}, region=REGION, timeout=1),
+            utils.wait_for_any_async({"OK_BUTTON": "ok.png"}, region=REGION, timeout=1),
+        )
+
+    assert asyncio.run(both()) == [MATCH, MATCH]
+    assert screen["grabs"] == 1
+
+
+def test_poll_does_not_grab_without_pending_waiters(screen):
+    async def poll_resolved_waiter():
+        waiter = utils.FrameWaiter(REGION, min_interval=0.01, max_interval=0.01)
+        # A resolved waiter stays listed until its wait_for_any returns
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(MATCH)
+        waiter._waiters.append((future, {"OK_BUTTON": "ok.png"}, 0.8))
+        task = asyncio.create_task(waiter._poll())
+        await asyncio.sleep(0.05)
+        waiter._waiters.clear()
+        await asyncio.wait_for(task, timeout=1)
+
+    asyncio.run(poll_resolved_waiter())
+    assert screen["grabs"] == 0
@@ -0,0 +1,173 @@
+"""
+Tiled multi-threaded template matching
+
+cv2.matchTemplate releases the GIL, so one large frame can be split into tiles that
+are matched in parallel on a thread pool. Each tile covers a block of the result map
+and reads an input slice padded by the template size, so the stitched map holds the
+scores of a single cv2.matchTemplate call at the same positions. It is not bit-exact:
+OpenCV correlates each tile in its own DFT blocks, so scores differ by float32 rounding
+(~1e-6 max on the benchmark frames). A clear peak lands on the same location, but
+minMaxLoc can pick a different one of two near-tied positions.
+
+Tile size and worker count are auto-tuned once per (frame, template, method) shape
+on this machine; when tiling is not faster the single call is used. Frame shapes are
+rounded up to SHAPE_BUCKET, so moving or slightly resizing the window does not retune,
+and match_template_tiled tunes on a background thread, using the single call until
+the result is ready - the farming loop never waits for tuning.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Dict, List, Optional, Set, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TILE_SIZES = (256, 512)
+TUNING_REPEATS = 2
+SHAPE_BUCKET = 256              # frame height/width rounding for the tuning key
+
+_executors: Dict[int, ThreadPoolExecutor] = {}
+_tuning: Dict[tuple, Tuple[Optional[int], int]] = {}  # shape key -> (tile_size or None for single call, workers)
+_pending: Set[tuple] = set()
+_tuner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autotune")
+_lock = threading.Lock()
+
+
+def _executor(workers: int) -> ThreadPoolExecutor:
+    executor = _executors.get(workers)
+    if executor is None:
+        executor = _executors[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="match")
+    return executor
+
+
+def _tile_bounds(result_shape: Tuple[int, int], tile_size: int) -> List[Tuple[int, int, int, int]]:
+    """Split the result map into (y0, y1, x0, x1) blocks"""
+    out_h, out_w = result_shape
+    return [(y, min(y + tile_size, out_h), x, min(x + tile_size, out_w))
+            for y in range(0, out_h, tile_size)
+            for x in range(0, out_w, tile_size)]
+
+
+def _worker_candidates() -> List[int]:
+    cpus = os.cpu_count() or 1
+    candidates = {cpus}
+    workers = 2
+    while workers < cpus:
+        candidates.add(workers)
+        workers *= 2
+    return sorted(c for c in candidates if c > 1)
+
+
+def _tuning_key(image_shape: tuple, template_shape: tuple, method: int) -> tuple:
+    """Frame height/width rounded up to SHAPE_BUCKET, template shape and method exact"""
+    bucketed = tuple(-(-size // SHAPE_BUCKET) * SHAPE_BUCKET for size in image_shape[:2]) + tuple(image_shape[2:])
+    return (bucketed, tuple(template_shape), method)
+
+
+def autotune(image_shape: tuple, template_shape: tuple, method: int = cv2.TM_CCOEFF_NORMED) -> Tuple[Optional[int], int]:
+    """
+    Time the single call against tile size / worker combinations on random data of the
+    (bucketed) given shape. Blocks; call it at startup to tune ahead of the first match.
+
+    :return: (tile_size, workers); tile_size is None when the single call is fastest
+    """
+    key = _tuning_key(image_shape, template_shape, method)
+    tuned = _tuning.get(key)
+    if tuned is not None:
+        return tuned
+    image_shape = key[0]
+
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 255, image_shape, dtype=np.uint8)
+    template = rng.integers(0, 255, template_shape, dtype=np.uint8)
+
+    def timed(tile_size, workers):
+        start = perf_counter()
+        for _ in range(TUNING_REPEATS):
+            if tile_size is None:
+                cv2.matchTemplate(image, template, method)
+            else:
+                match_template_tiled(image, template, method, tile_size=tile_size, workers=workers)
+        return (perf_counter() - start) / TUNING_REPEATS
+
+    best = (None, 1)
+    best_time = timed(None, 1)
+    single_time = best_time
+    for workers in _worker_candidates():
+        for tile_size in TILE_SIZES:
+            elapsed = timed(tile_size, workers)
+            if elapsed < best_time:
+                best, best_time = (tile_size, workers), elapsed
+
+    logger.info("Tiled matching tuned for %s / %s: tile=%s workers=%d (%.1f ms, single call %.1f ms)",
+                image_shape, template_shape, best[0], best[1], best_time * 1000, single_time * 1000)
+    _tuning[key] = best
+    return best
+
+
+def tuned_or_schedule(image_shape: tuple, template_shape: tuple, method: int = cv2.TM_CCOEFF_NORMED) -> Optional[Tuple[Optional[int], int]]:
+    """Tuning result for this shape, or None after queueing autotune on the background thread"""
+    key = _tuning_key(image_shape, template_shape, method)
+    tuned = _tuning.get(key)
+    if tuned is not None:
+        return tuned
+    with _lock:
+        if key not in _pending:
+            _pending.add(key)
+            _tuner.submit(_background_autotune, key, image_shape, template_shape, method)
+    return None
+
+
+def _background_autotune(key: tuple, image_shape: tuple, template_shape: tuple, method: int):
+    try:
+        autotune(image_shape, template_shape, method)
+    except Exception as e:
+        logger.error("Tiled matching tuning failed for %s: %s", image_shape, e)
+        _tuning[key] = (None, 1)
+    finally:
+        with _lock:
+            _pending.discard(key)
+
+
+def match_template_tiled(image: np.ndarray, template: np.ndarray, method: int = cv2.TM_CCOEFF_NORMED,
+                         tile_size: Optional[int] = None, workers: Optional[int] = None) -> np.ndarray:
+    """
+    Drop-in replacement for cv2.matchTemplate(image, template, method) that matches tiles in parallel.
+
+    :param image: Frame to search
+    :param template: Template, same channel count as image
+    :param method: cv2 matching method
+    :param tile_size: Result-map tile edge in pixels, auto-tuned when None (single call while tuning runs)
+    :param workers: Thread count, auto-tuned when None
+    :return: Result map with the same shape and scores as cv2.matchTemplate
+    """
+    h, w = template.shape[:2]
+    out_h, out_w = image.shape[0] - h + 1, image.shape[1] - w + 1
+    if out_h <= 0 or out_w <= 0:
+        return cv2.matchTemplate(image, template, method)  # Let cv2 raise its own size error
+
+    if tile_size is None or workers is None:
+        tuned = tuned_or_schedule(image.shape, template.shape, method)
+        if tuned is None:
+            return cv2.matchTemplate(image, template, method)
+        tile_size = tile_size or tuned[0]
+        workers = workers or tuned[1]
+
+    if tile_size is None or workers <= 1 or (tile_size >= out_h and tile_size >= out_w):
+        return cv2.matchTemplate(image, template, method)
+
+    result = np.empty((out_h, out_w), dtype=np.float32)
+
+    def match_tile(bounds):
+        y0, y1, x0, x1 = bounds
+        result[y0:y1, x0:x1] = cv2.matchTemplate(image[y0:y1 + h - 1, x0:x1 + w - 1], template, method)
+
+    # list() waits for all tiles and re-raises worker exceptions
+    list(_executor(workers).map(match_tile, _tile_bounds((out_h, out_w), tile_size)))
+    return result
@@ -2,14 +2,18 @@
 import win32gui as wn
 import win32api, win32con
 import pyautogui as ag
-from time import sleep,time
+from time import sleep,monotonic
 import asyncio
 import io
-from constants import CLICK_DELAY, MAX_WINDOW_WAIT, WINDOW_CHECK_INTERVAL, ICONS, APPROVAL_TIMEOUT,DEFAULT_CONFIDENCE
+import weakref
+from constants import CLICK_DELAY, MAX_WINDOW_WAIT, WINDOW_CHECK_INTERVAL, ICONS, APPROVAL_TIMEOUT,DEFAULT_CONFIDENCE, MIN_POLL_INTERVAL, OK_BUTTON_WAIT
 import cv2
 import numpy as np
-from typing import List, Tuple,Optional
+from typing import Dict, List, Tuple,Optional, Union
 import logging
+from probes import Probe, ProbeSet
+from detection import load_template, match_template_in_frame, find_template_location_colored, is_significant_overlap
+from log_setup import RATE_LIMITED
 
 logger = logging.getLogger(__name__)
 def click_on_window(hwnd, x, y, click_times=1):
@@ -47,7 +51,7 @@ def click_on_window(hwnd, x, y, click_times=1):
         return True
         
     except Exception as e:
-        logger.error(f"Click operation failed: {str(e)}")
+        logger.error("Click operation failed: %s", e)
         return False
 
 def scroll_down(clicks=3):
@@ -68,21 +72,176 @@ def toggle_fullscreen(hwnd):
     win32api.SendMessage(hwnd, win32con.WM_SYSKEYUP, win32con.VK_RETURN, 0x20000000)
 
 def wait_for_window(image_path,region ,max_wait=MAX_WINDOW_WAIT, check_interval=WINDOW_CHECK_INTERVAL,confidence=DEFAULT_CONFIDENCE):
-    start_time = time.time()
-    while time.time() - start_time < max_wait:
-        window = ag.locateOnScreen(image_path,region=region, confidence=confidence)
-        if window:
-            return window
-        sleep(check_interval)
+    found = wait_for_any({image_path: image_path}, region, timeout=max_wait, confidence=confidence, max_interval=check_interval)
+    if found:
+        # locateOnScreen ile aynı (left, top, width, height) biçimi
+        center_x, center_y, h, w, _ = found[1]
+        return (center_x - w // 2, center_y - h // 2, w, h)
     return None
 
-async def process_approval(update, context, chat_id, screen_region, hwnd):
+def match_conditions(frame: np.ndarray, waiters: List[Tuple[Dict[str, Union[str, Probe]], float]], region: Optional[tuple]) -> Dict[int, tuple]:
+    """
+    Birden fazla bekleyicinin koşullarını tek kare üzerinde dener.
+
+    Koşul bir şablon dosya yolu ya da bir Probe olabilir; tüm probe'lar tek bir ProbeSet
+    toplamasıyla değerlendirilir, şablonlar ise matchTemplate ile aranır.
+
+    :param frame: region'dan alınmış BGR kare
+    :param waiters: [({isim: şablon yolu veya Probe}, confidence), ...]
+    :param region: Karenin alındığı (x, y, width, height) bölgesi
+    :return: {bekleyici sırası: (isim, (global_x, global_y, h, w, skor))}
+    """
+    probes = [condition for conditions, _ in waiters for condition in conditions.values() if isinstance(condition, Probe)]
+    probe_hits = dict(zip(map(id, probes), ProbeSet(probes).evaluate_all(frame).tolist())) if probes else {}
+    origin_x, origin_y = (region[0], region[1]) if region else (0, 0)
+
+    results = {}
+    for index, (conditions, confidence) in enumerate(waiters):
+        for name, condition in conditions.items():
+            if isinstance(condition, Probe):
+                if probe_hits[id(condition)]:
+                    center_x, center_y = condition.center
+                    results[index] = (name, (origin_x + center_x, origin_y + center_y, *condition.size, 1.0))
+                    break
+            else:
+                match = match_template_in_frame(frame, load_template(condition), region, confidence)
+                if match:
+                    results[index] = (name, match)
+                    break
+    return results
+
+def wait_for_any(
+    templates: Dict[str, Union[str, Probe]],
+    region: Optional[Tuple[int, int, int, int]] = None,
+    timeout: float = MAX_WINDOW_WAIT,
+    confidence: float = DEFAULT_CONFIDENCE,
+    min_interval: float = MIN_POLL_INTERVAL,
+    max_interval: float = WINDOW_CHECK_INTERVAL
+) -> Optional[Tuple[str, Tuple[int, int, int, int, float]]]:
+    """
+    Birden fazla şablonu aynı anda bekler; her turda tek ekran görüntüsü alınır ve tüm şablonlar bu kareye karşı denenir.
+
+    Bekleme aralığı min_interval ile başlar, her başarısız turda max_interval'a kadar büyür.
+
+    :param templates: {isim: şablon dosya yolu veya Probe} sözlüğü
+    :param region: Arama yapılacak bölgenin (x, y, width, height) tuple'ı, None ise tüm ekran
+    :param timeout: Saniye cinsinden en uzun bekleme süresi
+    :param confidence: Eşleşme eşik değeri
+    :return: İlk eşleşen (isim, (global_x, global_y, h, w, max_val)) veya zaman aşımında None
+    """
+    deadline = monotonic() + timeout
+    interval = min_interval
+    while True:
+        frame = grab_frame(region)
+        results = match_conditions(frame, [(templates, confidence)], region)
+        if results:
+            return results[0]
+
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            return None
+        sleep(min(interval, remaining))
+        interval = min(interval * 1.5, max_interval)
+
+class FrameWaiter:
+    """
+    Aynı bölgeyi bekleyen tüm asyncio görevlerini tek bir tarama döngüsünde toplar.
+
+    Her turda bir kare alınır ve bekleyen tüm koşullar bu kareye karşı denenir; koşulu
+    sağlanan bekleyici hemen çözülür. Yeni bir bekleyici gelince aralık min_interval'a döner.
+    """
+
+    def __init__(self, region=None, min_interval=MIN_POLL_INTERVAL, max_interval=WINDOW_CHECK_INTERVAL):
+        self.region = region
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._waiters = []  # [(future, templates, confidence), ...]
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def wait_for_any(self, templates: Dict[str, Union[str, Probe]], timeout: float = MAX_WINDOW_WAIT, confidence: float = DEFAULT_CONFIDENCE):
+        """wait_for_any'nin asyncio karşılığı; aynı dönüş biçimini kullanır."""
+        future = asyncio.get_running_loop().create_future()
+        waiter = (future, templates, confidence)
+        self._waiters.append(waiter)
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._poll())
+
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _match_pending(self, pending):
+        frame = grab_frame(self.region)
+        matches = match_conditions(frame, [(templates, confidence) for _, templates, confidence in pending], self.region)
+        return [(pending[index][0], result) for index, result in matches.items()]
+
+    async def _poll(self):
+        interval = self.min_interval
+        while self._waiters:
+            self._wakeup.clear()
+            pending = [w for w in self._waiters if not w[0].done()]
+            # Çözülmüş ama henüz listeden çıkmamış bekleyiciler için ekran görüntüsü alınmaz
+            if pending:
+                try:
+                    results = await asyncio.to_thread(self._match_pending, pending)
+                except Exception as e:
+                    for future, _, _ in pending:
+                        if not future.done():
+                            future.set_exception(e)
+                    return
+
+                for future, result in results:
+                    if not future.done():
+                        future.set_result(result)
+            if not self._waiters:
+                return
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+                interval = self.min_interval
+            except asyncio.TimeoutError:
+                interval = min(interval * 1.5, self.max_interval)
+
+# asyncio.Event ve görevler tek bir olay döngüsüne bağlıdır; bu yüzden FrameWaiter'lar
+# çalışan döngü başına tutulur, döngü kapanınca girdileri de düşer
+_frame_waiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Optional[Tuple[int, int, int, int]], FrameWaiter]]" = weakref.WeakKeyDictionary()
+
+async def wait_for_any_async(
+    templates: Dict[str, Union[str, Probe]],
+    region: Optional[Tuple[int, int, int, int]] = None,
+    timeout: float = MAX_WINDOW_WAIT,
+    confidence: float = DEFAULT_CONFIDENCE
+) -> Optional[Tuple[str, Tuple[int, int, int, int, float]]]:
+    """
+    wait_for_any'nin asyncio sürümü. Aynı bölgeyi bekleyen eşzamanlı çağrılar tek bir
+    FrameWaiter'ı paylaşır, yani her turda yalnızca bir ekran görüntüsü alınır.
+    """
+    region = tuple(region) if region is not None else None
+    waiters = _frame_waiters.setdefault(asyncio.get_running_loop(), {})
+    waiter = waiters.get(region)
+    if waiter is None:
+        waiter = waiters[region] = FrameWaiter(region)
+    return await waiter.wait_for_any(templates, timeout=timeout, confidence=confidence)
+
+async def process_approval(update, context, chat_id, screen_region, hwnd, probes: Optional[ProbeSet] = None):
     approval_received = await wait_for_approval(chat_id, context)
     
     if approval_received:
-        okButton = ag.locateCenterOnScreen(ICONS['OK_BUTTON'], region=screen_region, confidence=0.8)
-        if okButton:
-            click_on_window(hwnd, okButton.x, okButton.y, click_times=1)
+        # OK_BUTTON probe tanımlıysa şablonla birlikte beklenir; hangisi önce tutarsa o kullanılır.
+        # Probe koordinatları screen_region'a görelidir; PROBE_SPECS istemci alanı koordinatı kullanır
+        conditions = {'OK_BUTTON': ICONS['OK_BUTTON']}
+        if probes is not None and 'OK_BUTTON' in probes:
+            conditions = {'OK_BUTTON_PROBE': probes.get('OK_BUTTON'), **conditions}
+        found = await wait_for_any_async(conditions, region=screen_region, timeout=OK_BUTTON_WAIT, confidence=0.8)
+        if found:
+            ok_x, ok_y = found[1][:2]
+            click_on_window(hwnd, ok_x, ok_y, click_times=1)
             await context.bot.send_message(chat_id=chat_id, text="İşlem tamamlandı.")
         else:
             await context.bot.send_message(chat_id=chat_id, text="Son onay aşamasında OK butonu bulunamadı.")
@@ -188,39 +347,10 @@ def find_template_location(template_path: str, screenshot_region: Tuple[int, int
     else:
         return None 
 
-def find_template_location_colored(template_path: str, screenshot_region: tuple) -> tuple:
-    # Şablonu yükle
-    template = cv2.imread(template_path, cv2.IMREAD_COLOR)
-    
-    if template is None:
-        raise FileNotFoundError(f"Template image not found: {template_path}")
-
-    # Belirtilen bölgenin ekran görüntüsünü al
-    screenshot = ag.screenshot(region=screenshot_region)
-    screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
-
-    # Template matching uygula
-    result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-    min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-    
-    # Eşleşme eşik değeri (SellMerchant pattern için düşük threshold)
-    threshold = 0.4
-    
-    if max_val >= threshold:
-        # Şablon boyutlarını al
-        h, w = template.shape[:2]
-        
-        # Merkez noktayı hesapla
-        center_x = max_loc[0] + w // 2
-        center_y = max_loc[1] + h // 2
-        
-        # Global koordinatlara dönüştür
-        global_x = screenshot_region[0] + center_x
-        global_y = screenshot_region[1] + center_y
-        
-        return (global_x, global_y, h, w, max_val)
-    else:
-        return None
+def grab_frame(region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+    """Belirtilen bölgenin ekran görüntüsünü BGR numpy dizisi olarak döndürür."""
+    screenshot = ag.screenshot(region=region)
+    return cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
 
 
 def preprocess_image(image):
@@ -269,7 +399,7 @@ def find_all_template_locations(
            
             current_confidence -= step
         except Exception as e:
-            logger.error(f"Error in locateAllOnScreen: {str(e)}")
+            logger.error("Error in locateAllOnScreen: %s", e)
             break
 
     # Çakışan konumları birleştir ve en iyi skorları tut
@@ -278,29 +408,9 @@ def find_all_template_locations(
         if not any(is_significant_overlap(match, existing_match) for existing_match in filtered_matches):
             filtered_matches.append(match)
 
-    logger.info(f"{len(filtered_matches)} eşleşme bulundu. Şablon: {template_path}, En iyi confidence: {current_confidence}")
+    logger.info("%s eşleşme bulundu. Şablon: %s, En iyi confidence: %s", len(filtered_matches), template_path, current_confidence, extra=RATE_LIMITED)
     return filtered_matches
 
-def is_significant_overlap(match1: Tuple[int, int, int, int, float], match2: Tuple[int, int, int, int, float], overlap_threshold: float = 0.7) -> bool:
-    """
-    İki eşleşme arasında önemli bir çakışma olup olmadığını kontrol eder.
-
-    :param match1: Birinci eşleşme (x, y, w, h, confidence)
-    :param match2: İkinci eşleşme (x, y, w, h, confidence)
-    :param overlap_threshold: Çakışma için eşik değeri
-    :return: Önemli çakışma varsa True, yoksa False
-    """
-    x1, y1, w1, h1, _ = match1
-    x2, y2, w2, h2, _ = match2
-
-    overlap_x = max(0, min(x1 + w1, x2 + w2) - max(x1, x2))
-    overlap_y = max(0, min(y1 + h1, y2 + h2) - max(y1, y2))
-    overlap_area = overlap_x * overlap_y
-    
-    min_area = min(w1 * h1, w2 * h2)
-    
-    return overlap_area / min_area > overlap_threshold
-
 import ctypes
 import time
 from ctypes import wintypes